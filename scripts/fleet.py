@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Fleet runner: roll the highstate across many hosts with salt-ssh in batches."""
+
+import atexit
+import fnmatch
+import math
+import sys
+import time
+
+from saltrunner.common import REPO_DIR, ROSTER, admin_key, load_env
+from saltrunner.results import summarize
+from saltrunner.saltssh import cleanup_roster, run_with_spinner, salt_ssh_cmd
+from saltrunner.secretfiles import cleanup_secrets, decrypt_secrets
+
+ENV_FILE = REPO_DIR / ".fleet.env"
+
+USAGE = """\
+Usage: fleet.py [command] [target] [--fail-fast]
+
+Commands:
+  hosts [target]          List hosts matched by target (default: '*')
+  check <state> [target]  Apply a single state across matched hosts in batches
+  test [target]           Run highstate across matched hosts in batches (default)
+
+Targets are minion ID globs, as in salt/pillar/top.sls (e.g. 'test_hetzner_*').
+Batches roll out canary-first: FLEET_BATCHES=1,10%,100% runs one host, then 10%
+of the fleet, then the rest. Rollout stops after a batch with any failure.
+
+Options:
+  --fail-fast    Run states with failhard=True (stop each host at its first failure)\
+"""
+
+
+def load_fleet_env():
+    """Load configuration from .fleet.env."""
+    env = load_env(ENV_FILE, ["FLEET_HOSTS", "ADMIN_SSH_KEY"])
+    env.setdefault("FLEET_MAX_PROCS", "25")
+    env.setdefault("FLEET_BATCHES", "1,10%,100%")
+    return env
+
+
+def parse_hosts(env):
+    """Parse FLEET_HOSTS (minion_id@host[:port], comma-separated) into a dict."""
+    hosts = {}
+    for entry in env["FLEET_HOSTS"].split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        minion_id, sep, address = entry.partition("@")
+        if not sep:
+            sys.exit(f"Invalid FLEET_HOSTS entry (want minion_id@host[:port]): {entry}")
+        host, _, port = address.partition(":")
+        hosts[minion_id] = (host, int(port or 22))
+    return hosts
+
+
+def match_hosts(hosts, target):
+    """Return the minion IDs matching a glob target, in FLEET_HOSTS order."""
+    matched = [m for m in hosts if fnmatch.fnmatch(m, target)]
+    if not matched:
+        sys.exit(f"No hosts match '{target}'.")
+    return matched
+
+
+def plan_batches(minions, spec):
+    """Split minions into rollout batches from a spec like '1,10%,100%'.
+
+    Each entry is a batch size — an absolute count or a percentage of the
+    whole fleet (rounded up).  The last size repeats until every host is
+    scheduled.
+    """
+    sizes = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part.endswith("%"):
+            sizes.append(max(1, math.ceil(len(minions) * float(part[:-1]) / 100)))
+        else:
+            sizes.append(max(1, int(part)))
+    batches = []
+    remaining = list(minions)
+    i = 0
+    while remaining:
+        size = sizes[min(i, len(sizes) - 1)]
+        batches.append(remaining[:size])
+        remaining = remaining[size:]
+        i += 1
+    return batches
+
+
+def write_roster(hosts, minions, env):
+    """Write a multi-host salt-ssh roster for the given minions."""
+    key = admin_key(env)
+    lines = []
+    for minion_id in minions:
+        host, port = hosts[minion_id]
+        lines += [
+            f"{minion_id}:",
+            f"  host: {host}",
+            f"  port: {port}",
+            "  user: admin",
+            "  sudo: True",
+            f"  priv: {key}",
+        ]
+    ROSTER.write_text("\n".join(lines) + "\n")
+
+
+atexit.register(cleanup_secrets)
+atexit.register(cleanup_roster)
+
+
+def print_fleet_summary(results, minions):
+    """Print one line per host and fleet totals; return True if every host succeeded."""
+    totals = {"succeeded": 0, "changed": 0, "failed": 0}
+    bad = 0
+    print(f"\n  {'host':<28} {'ok':>5} {'changed':>8} {'failed':>7} {'state s':>8}")
+    for minion in minions:
+        states = results.get(minion)
+        if isinstance(states, list):
+            summary, failed_ids = summarize(states)
+            for k in totals:
+                totals[k] += summary[k]
+            seconds = sum(s.duration for s in states) / 1000
+            mark = "✓" if not failed_ids else "✗"
+            bad += bool(failed_ids)
+            print(
+                f"{mark} {minion:<28} {summary['succeeded']:>5} {summary['changed']:>8}"
+                f" {summary['failed']:>7} {seconds:>8.1f}"
+            )
+            for fid in failed_ids:
+                print(f"    FAILED: {fid}")
+        else:
+            bad += 1
+            error = (states or "no return").splitlines()[0]
+            print(f"✗ {minion:<28} {error}")
+    print(
+        f"\n{'✓' if not bad else '✗'}  hosts={len(minions)}, failed hosts={bad}"
+        f" — succeeded={totals['succeeded']}, changed={totals['changed']},"
+        f" failed={totals['failed']}"
+    )
+    return not bad
+
+
+def rollout(env, target, label, *args):
+    """Apply a salt function across the matched hosts batch by batch."""
+    hosts = parse_hosts(env)
+    minions = match_hosts(hosts, target)
+    batches = plan_batches(minions, env["FLEET_BATCHES"])
+    max_procs = int(env["FLEET_MAX_PROCS"])
+    write_roster(hosts, minions, env)
+    decrypt_secrets(env, minions)
+
+    print(
+        f"{label} on {len(minions)} host(s) in {len(batches)} batch(es):"
+        f" {', '.join(str(len(b)) for b in batches)} (max-procs {max_procs})"
+    )
+    results = {}
+    done = []
+    start = time.time()
+    for n, batch in enumerate(batches, 1):
+        batch_results = run_with_spinner(
+            salt_ssh_cmd(batch, *args, max_procs=max_procs),
+            batch,
+            label=f"fleet: Batch {n}/{len(batches)} ({len(batch)} host(s))",
+            exit_on_error=False,
+        ) or {}
+        results.update(batch_results)
+        done += batch
+        ok = print_fleet_summary(batch_results, batch)
+        if not ok:
+            skipped = len(minions) - len(done)
+            print(f"\n✗  rollout stopped after batch {n}; {skipped} host(s) not touched.")
+            break
+
+    print(f"\nFleet summary ({int(time.time() - start)}s):", end="")
+    if not print_fleet_summary(results, done) or len(done) != len(minions):
+        sys.exit(1)
+
+
+def cmd_hosts(env, target="*"):
+    hosts = parse_hosts(env)
+    minions = match_hosts(hosts, target)
+    batches = plan_batches(minions, env["FLEET_BATCHES"])
+    for n, batch in enumerate(batches, 1):
+        for minion in batch:
+            host, port = hosts[minion]
+            print(f"batch {n}  {minion:<28} {host}:{port}")
+
+
+def cmd_check(env, state="base.hostname", target="*", fail_fast=False):
+    rollout(
+        env, target, f"Checking {state}",
+        "state.apply", state,
+        *(["failhard=True"] if fail_fast else []),
+    )
+
+
+def cmd_test(env, target="*", fail_fast=False):
+    rollout(
+        env, target, "Running highstate",
+        "state.highstate",
+        *(["failhard=True"] if fail_fast else []),
+    )
+
+
+def main():
+    env = load_fleet_env()
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else None
+    args = [a for a in sys.argv[2:] if not a.startswith("--")]
+    fail_fast = "--fail-fast" in sys.argv[2:]
+
+    if cmd is None or cmd in ("help", "-h", "--help"):
+        print(USAGE)
+    elif cmd == "hosts":
+        cmd_hosts(env, *args)
+    elif cmd == "check":
+        cmd_check(env, *args, fail_fast=fail_fast)
+    elif cmd == "test":
+        cmd_test(env, *args, fail_fast=fail_fast)
+    else:
+        sys.exit(f"Unknown command: {cmd}\n{USAGE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Closed-loop HTTP/1.1 load generator and static test corpus.
+
+Stdlib only, so it runs inside the Debian test target as well as on the
+host.  Each connection sends one keep-alive request at a time and issues
+the next as soon as the response is read, so the offered load is set by
+the concurrency.  Connections are spread over one process per CPU.
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+# name -> (size in bytes, compressible text?)
+CORPUS = {
+    "index.html": (2 * 1024, True),
+    "app.css": (16 * 1024, True),
+    "app.js": (64 * 1024, True),
+    "photo.jpg": (256 * 1024, False),
+}
+WARMUP = 1.0  # seconds of unmeasured load before each run
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+USAGE = """\
+Usage: loadgen.py <command> [args]
+
+Commands:
+  corpus DIR      Write the fixed benchmark corpus to DIR
+  run URL CONCURRENCY SECONDS [--host=NAME]
+                  Request the corpus files under URL (http:// or https://)
+                  over CONCURRENCY keep-alive connections for SECONDS and
+                  print requests/s and latency percentiles as JSON.
+                  --host sets the Host header and TLS server name.
+                  TLS certificates are not verified.\
+"""
+
+
+def write_corpus(directory):
+    """Write the corpus files; the content is seeded, so identical on every run."""
+    rng = random.Random(0)
+    os.makedirs(directory, exist_ok=True)
+    for name, (size, text) in CORPUS.items():
+        if text:
+            data = " ".join(rng.choice(WORDS) for _ in range(size // 4)).encode()[:size]
+        else:
+            data = rng.randbytes(size)
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+
+
+async def read_response(reader):
+    """Read one response; return (status, keep_alive, body bytes)."""
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+    status = int(head.split(" ", 2)[1])
+    headers = dict(line.split(":", 1) for line in head.split("\r\n")[1:] if ":" in line)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+    size = 0
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            chunk = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(chunk + 2)
+            size += chunk
+            if not chunk:
+                break
+    else:
+        size = int(headers.get("content-length", 0))
+        await reader.readexactly(size)
+    return status, headers.get("connection") != "close", size
+
+
+async def connection(url, host, measure_from, deadline, stats):
+    """Request the corpus files round-robin over one connection, reconnecting as needed.
+
+    Only requests sent after measure_from are counted.
+    """
+    tls = url.scheme == "https"
+    ctx = None
+    if tls:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    port = url.port or (443 if tls else 80)
+    prefix = url.path.rstrip("/")
+    names = list(CORPUS)
+    i = random.randrange(len(names))
+    while time.monotonic() < deadline:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(
+                url.hostname, port, ssl=ctx, server_hostname=host if tls else None
+            )
+            keep_alive = True
+            while keep_alive and time.monotonic() < deadline:
+                i += 1
+                request = (
+                    f"GET {prefix}/{names[i % len(names)]} HTTP/1.1\r\n"
+                    f"Host: {host}\r\nAccept-Encoding: gzip\r\n\r\n"
+                )
+                counted = time.monotonic() >= measure_from
+                start = time.perf_counter()
+                writer.write(request.encode())
+                status, keep_alive, size = await read_response(reader)
+                if counted:
+                    stats["latencies"].append((time.perf_counter() - start) * 1000)
+                    stats["bytes"] += size
+                    stats["errors"] += status >= 400
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError):
+            stats["errors"] += 1
+            await asyncio.sleep(0.01)
+        finally:
+            if writer:
+                writer.close()
+
+
+def worker(url, host, connections, measure_from, deadline):
+    """Run connections concurrent clients in this process until deadline."""
+    stats = {"latencies": [], "errors": 0, "bytes": 0}
+
+    async def main():
+        await asyncio.gather(
+            *(connection(urlsplit(url), host, measure_from, deadline, stats) for _ in range(connections))
+        )
+
+    asyncio.run(main())
+    return stats
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+def load(url, concurrency, seconds, host=None):
+    """Drive the load and return the summary dict."""
+    host = host or urlsplit(url).hostname
+    procs = max(1, min(os.cpu_count() or 1, concurrency))
+    shares = [concurrency // procs + (1 if p < concurrency % procs else 0) for p in range(procs)]
+    # The first WARMUP seconds (process start, connection setup) are not
+    # measured.  CLOCK_MONOTONIC is system-wide on Linux, so the workers can
+    # share the marks.
+    measure_from = time.monotonic() + WARMUP
+    deadline = measure_from + seconds
+    with ProcessPoolExecutor(procs) as pool:
+        results = list(pool.map(
+            worker, [url] * procs, [host] * procs, shares, [measure_from] * procs, [deadline] * procs
+        ))
+    latencies = sorted(ms for r in results for ms in r["latencies"])
+    return {
+        "requests": len(latencies),
+        "errors": sum(r["errors"] for r in results),
+        "seconds": seconds,
+        "rps": round(len(latencies) / seconds, 1),
+        "mib_s": round(sum(r["bytes"] for r in results) / seconds / 2**20, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    cmd = args[0] if args else None
+    if cmd in (None, "help", "-h", "--help"):
+        print(USAGE)
+    elif cmd == "corpus" and len(args) == 2:
+        write_corpus(args[1])
+    elif cmd == "run" and len(args) == 4:
+        print(json.dumps(load(args[1], int(args[2]), float(args[3]), options.get("host"))))
+    else:
+        sys.exit(f"Unknown command or wrong arguments: {' '.join(args)}\n{USAGE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Hetzner Cloud and OCI APIs the VM runners use.
+
+VMs are Docker containers started from the test image, so create, check,
+test and delete run end to end without a cloud account.  Request latency
+and failures can be injected, and every request is counted per route, so
+the runners' API round-trips, polling cadence and SSH waits can be
+measured (`bench`) before they reach a real account.
+"""
+
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from saltrunner.common import LOG_DIR, REPO_DIR, load_env
+
+IMAGE = "server-salt:latest"
+BENCH_COMMANDS = ["create", "check", "test", "delete"]
+MOCK_COMPARTMENT = "ocid1.compartment.oc1..mock"
+MOCK_NAMESPACE = "mocknamespace"
+AVAILABILITY_DOMAINS = ["mock:AD-1", "mock:AD-2", "mock:AD-3"]
+# Like the free tier, the micro shape is offered in one AD only
+SHAPES = {ad: ["VM.Standard.E4.Flex"] for ad in AVAILABILITY_DOMAINS}
+SHAPES[AVAILABILITY_DOMAINS[-1]].append("VM.Standard.E2.1.Micro")
+
+USAGE = """\
+Usage: mockcloud.py <command> [options]
+
+Commands:
+  serve                 Run the mock API until interrupted
+  bench <hetzner|oci> [command ...]
+                        Start the mock, run the runner's commands against it
+                        (default: create check test delete) and report wall
+                        time, API calls and connections per command
+
+Options:
+  --port N              Listen port (default: 8780)
+  --latency MS          Added to every API request (default: 0)
+  --jitter MS           Random extra latency, 0..MS (default: 0)
+  --fail-rate P         Answer this fraction of matching requests with 503
+  --fail-match TEXT     Only inject failures into requests whose "METHOD path"
+                        contains TEXT (default: every request)
+  --boot-delay S        Seconds until a new VM reports running (default: 5);
+                        OCI assigns the public IP halfway through
+  --vm-ip ADDR          Don't start containers; every VM gets ADDR, e.g. a host
+                        already running sshd (API timing only)
+  --image IMAGE         Image for VM containers (default: server-salt:latest)
+  --runs N              bench: repeat the command sequence N times (default: 1)
+  --key PATH            bench: admin SSH key (default: ADMIN_SSH_KEY from the
+                        provider's or the docker env file)
+
+Hetzner API: http://127.0.0.1:PORT/v1 (HCLOUD_ENDPOINT)
+OCI API:     http://127.0.0.1:PORT     (OCI_ENDPOINT)
+Control:     GET /_mock/stats, POST /_mock/reset, POST /_mock/config {settings}\
+"""
+
+
+def timestamp(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def route_name(method, path):
+    """Collapse IDs and object names so requests count per route."""
+    path = re.sub(r"^/20160918(?=/)", "", path)
+    path = re.sub(r"^/n/[^/]+/b/[^/]+/o/.+$", "/n/{ns}/b/{bucket}/o/{object}", path)
+    path = re.sub(r"/(\d+|ocid1\.[^/]+)(?=/|$)", "/{id}", path)
+    return f"{method} {path}"
+
+
+class Cloud:
+    """VM records, request counters and fault settings shared by all handlers."""
+
+    def __init__(self, image=IMAGE, vm_ip=None, **settings):
+        self.image = image
+        self.vm_ip = vm_ip
+        self.settings = {
+            "latency_ms": 0,
+            "jitter_ms": 0,
+            "fail_rate": 0.0,
+            "fail_match": "",
+            "boot_delay": 5.0,
+        }
+        self.settings.update(settings)
+        self.lock = threading.Lock()
+        self.vms = {}
+        self.actions = {}
+        self.next_id = 1
+        self.requests = Counter()
+        self.connections = 0
+
+    def new_id(self):
+        with self.lock:
+            self.next_id += 1
+            return self.next_id - 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "total": sum(self.requests.values()),
+                "connections": self.connections,
+                "vms": sum(1 for vm in self.vms.values() if not vm["deleted"]),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.connections = 0
+
+    def create_vm(self, name, **extra):
+        """Start a VM container and return its record, marked failed if docker run fails."""
+        vm_id = self.new_id()
+        vm = {
+            "id": vm_id,
+            "name": name,
+            "created": time.time(),
+            "boot_delay": float(self.settings["boot_delay"]),
+            "container": None,
+            "ip": self.vm_ip,
+            "failed": False,
+            "deleted": False,
+            **extra,
+        }
+        if not self.vm_ip:
+            container = f"mockcloud-{vm_id}"
+            result = subprocess.run(
+                [
+                    "docker", "run", "-d",
+                    "--name", container,
+                    "--hostname", name,
+                    "--label", "mockcloud=1",
+                    "--privileged",
+                    "--cgroupns=host",
+                    "-v", "/sys/fs/cgroup:/sys/fs/cgroup:rw",
+                    "--tmpfs", "/run",
+                    "--tmpfs", "/run/lock",
+                    self.image,
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode == 0:
+                vm["container"] = container
+                vm["ip"] = subprocess.run(
+                    [
+                        "docker", "inspect", "-f",
+                        "{{range .NetworkSettings.Networks}}{{.IPAddress}}{{end}}",
+                        container,
+                    ],
+                    capture_output=True,
+                    text=True,
+                ).stdout.strip()
+            else:
+                print(f"docker run failed: {result.stderr.strip()}", file=sys.stderr)
+                vm["failed"] = True
+        with self.lock:
+            self.vms[vm_id] = vm
+        return vm
+
+    def delete_vm(self, vm):
+        if vm["container"]:
+            subprocess.run(["docker", "rm", "-f", vm["container"]], capture_output=True)
+        vm["deleted"] = True
+
+    def cleanup(self):
+        """Remove every container this mock started."""
+        for vm in list(self.vms.values()):
+            if not vm["deleted"]:
+                self.delete_vm(vm)
+
+    def running(self, vm):
+        return not vm["failed"] and time.time() >= vm["created"] + vm["boot_delay"]
+
+    def ip_assigned(self, vm):
+        return not vm["failed"] and time.time() >= vm["created"] + vm["boot_delay"] / 2
+
+    def new_action(self, command, vm, duration):
+        action_id = self.new_id()
+        self.actions[action_id] = {
+            "command": command,
+            "vm": vm,
+            "started": time.time(),
+            "done_at": time.time() + duration,
+        }
+        return self.action_json(action_id)
+
+    def action_json(self, action_id):
+        action = self.actions[action_id]
+        status = "running"
+        if action["vm"]["failed"]:
+            status = "error"
+        elif time.time() >= action["done_at"]:
+            status = "success"
+        return {
+            "id": action_id,
+            "command": action["command"],
+            "status": status,
+            "progress": 100 if status != "running" else 0,
+            "started": timestamp(action["started"]),
+            "finished": timestamp(action["done_at"]) if status != "running" else None,
+            "resources": [{"id": action["vm"]["id"], "type": "server"}],
+            "error": {"code": "action_failed", "message": "VM container did not start"}
+            if status == "error" else None,
+        }
+
+    # Hetzner Cloud API ----------------------------------------------------
+
+    def hetzner_server(self, vm):
+        return {
+            "id": vm["id"],
+            "name": vm["name"],
+            "status": "running" if self.running(vm) else "initializing",
+            "created": timestamp(vm["created"]),
+            "public_net": {"ipv4": {"ip": vm["ip"]}, "ipv6": None},
+            "server_type": {"name": vm["server_type"]},
+            "datacenter": {"location": {"name": vm["location"]}},
+        }
+
+    def hetzner(self, method, path, query, body):
+        servers = [vm for vm in self.vms.values() if vm["kind"] == "hetzner" and not vm["deleted"]]
+        if method == "GET" and path == "/servers":
+            if "name" in query:
+                servers = [vm for vm in servers if vm["name"] == query["name"][0]]
+            return 200, {"servers": [self.hetzner_server(vm) for vm in servers], "meta": {"pagination": {"next_page": None}}}
+        if method == "POST" and path == "/servers":
+            missing = [k for k in ("name", "server_type", "image") if not body.get(k)]
+            if missing:
+                return 422, {"error": {"code": "invalid_input", "message": f"missing: {', '.join(missing)}"}}
+            if any(vm["name"] == body["name"] for vm in servers):
+                return 409, {"error": {"code": "uniqueness_error", "message": "server name is already used"}}
+            vm = self.create_vm(
+                body["name"],
+                kind="hetzner",
+                server_type=body["server_type"],
+                location=body.get("location", "fsn1"),
+            )
+            action = self.new_action("create_server", vm, vm["boot_delay"])
+            return 201, {"server": self.hetzner_server(vm), "action": action, "next_actions": [], "root_password": None}
+        if match := re.fullmatch(r"/actions/(\d+)", path):
+            if int(match[1]) not in self.actions:
+                return 404, {"error": {"code": "not_found", "message": "action not found"}}
+            return 200, {"action": self.action_json(int(match[1]))}
+        if match := re.fullmatch(r"/servers/(\d+)", path):
+            vm = next((vm for vm in servers if vm["id"] == int(match[1])), None)
+            if not vm:
+                return 404, {"error": {"code": "not_found", "message": "server not found"}}
+            if method == "GET":
+                return 200, {"server": self.hetzner_server(vm)}
+            if method == "DELETE":
+                self.delete_vm(vm)
+                return 200, {"action": self.new_action("delete_server", vm, 1.0)}
+        return 404, {"error": {"code": "not_found", "message": f"{method} {path} is not emulated"}}
+
+    # OCI API --------------------------------------------------------------
+
+    def oci_instance(self, vm):
+        state = "PROVISIONING"
+        if vm["deleted"]:
+            state = "TERMINATED"
+        elif vm["failed"]:
+            state = "TERMINATING"
+        elif self.running(vm):
+            state = "RUNNING"
+        return {
+            "id": f"ocid1.instance.oc1..{vm['id']}",
+            "displayName": vm["name"],
+            "compartmentId": vm["compartment"],
+            "availabilityDomain": vm["availability_domain"],
+            "shape": vm["shape"],
+            "imageId": vm["image_id"],
+            "region": "us-ashburn-1",
+            "lifecycleState": state,
+            "timeCreated": timestamp(vm["created"]),
+        }
+
+    def oci_vm(self, ocid):
+        match = re.fullmatch(r"ocid1\.\w+\.oc1\.\.(\d+)", ocid)
+        vm = match and self.vms.get(int(match[1]))
+        return vm if vm and vm["kind"] == "oci" else None
+
+    def oci(self, method, path, query, body):
+        path = re.sub(r"^/20160918(?=/)", "", path)
+        def arg(name):
+            return query.get(name, [None])[0]
+
+        vms = [vm for vm in self.vms.values() if vm["kind"] == "oci"]
+        if method == "GET" and path == "/availabilityDomains":
+            return 200, [{"name": ad, "id": f"ocid1.ad.oc1..{i}", "compartmentId": arg("compartmentId")}
+                         for i, ad in enumerate(AVAILABILITY_DOMAINS)]
+        if method == "GET" and path == "/shapes":
+            return 200, [{"shape": shape} for shape in SHAPES.get(arg("availabilityDomain"), [])]
+        if method == "GET" and path == "/instances":
+            vms = [vm for vm in vms if vm["compartment"] == arg("compartmentId")]
+            if arg("displayName"):
+                vms = [vm for vm in vms if vm["name"] == arg("displayName")]
+            return 200, [self.oci_instance(vm) for vm in vms]
+        if method == "POST" and path == "/instances":
+            ad = body.get("availabilityDomain")
+            if body.get("shape") not in SHAPES.get(ad, []):
+                return 400, {"code": "InvalidParameter", "message": f"Shape {body.get('shape')} is not available in {ad}"}
+            vm = self.create_vm(
+                body.get("displayName", "instance"),
+                kind="oci",
+                compartment=body.get("compartmentId"),
+                availability_domain=ad,
+                shape=body["shape"],
+                image_id=body.get("imageId") or (body.get("sourceDetails") or {}).get("imageId"),
+            )
+            return 200, self.oci_instance(vm)
+        if match := re.fullmatch(r"/instances/([^/]+)", path):
+            vm = self.oci_vm(match[1])
+            if not vm:
+                return 404, {"code": "NotAuthorizedOrNotFound", "message": "instance not found"}
+            if method == "GET":
+                return 200, self.oci_instance(vm)
+            if method == "DELETE":
+                self.delete_vm(vm)
+                return 204, None
+        if method == "GET" and path == "/vnicAttachments":
+            vm = self.oci_vm(arg("instanceId") or "")
+            if not vm or vm["deleted"] or not self.ip_assigned(vm):
+                return 200, []
+            return 200, [{
+                "id": f"ocid1.vnicattachment.oc1..{vm['id']}",
+                "instanceId": arg("instanceId"),
+                "vnicId": f"ocid1.vnic.oc1..{vm['id']}",
+                "compartmentId": vm["compartment"],
+                "availabilityDomain": vm["availability_domain"],
+                "lifecycleState": "ATTACHED",
+                "timeCreated": timestamp(vm["created"]),
+            }]
+        if match := re.fullmatch(r"/vnics/([^/]+)", path):
+            vm = self.oci_vm(match[1])
+            if not vm:
+                return 404, {"code": "NotAuthorizedOrNotFound", "message": "vnic not found"}
+            return 200, {
+                "id": match[1],
+                "publicIp": vm["ip"],
+                "privateIp": vm["ip"],
+                "isPrimary": True,
+                "lifecycleState": "AVAILABLE",
+                "timeCreated": timestamp(vm["created"]),
+            }
+        if method == "GET" and path in ("/n", "/n/"):
+            return 200, MOCK_NAMESPACE
+        if path.startswith("/n/"):
+            return 404, {"code": "ObjectNotFound", "message": "Object Storage is emulated for namespace lookups only"}
+        return 404, {"code": "NotAuthorizedOrNotFound", "message": f"{method} {path} is not emulated"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Routes /v1/* to the Hetzner emulation, /_mock/* to control, the rest to OCI."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse shows in the stats
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.cloud.lock:
+            self.server.cloud.connections += 1
+
+    def send_json(self, status, payload, hetzner):
+        data = b"" if payload is None or self.command == "HEAD" else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if not hetzner:
+            self.send_header("opc-request-id", f"mock-{random.getrandbits(48):012x}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self):
+        cloud = self.server.cloud
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        body = json.loads(raw) if raw else {}
+
+        if url.path.startswith("/_mock/"):
+            if url.path == "/_mock/reset" and self.command == "POST":
+                cloud.reset()
+            elif url.path == "/_mock/config" and self.command == "POST":
+                cloud.settings.update({k: v for k, v in body.items() if k in cloud.settings})
+                return self.send_json(200, cloud.settings, True)
+            return self.send_json(200, cloud.stats(), True)
+
+        hetzner = url.path.startswith("/v1/")
+        path = url.path[3:] if hetzner else url.path
+        with cloud.lock:
+            cloud.requests[route_name(self.command, path)] += 1
+        settings = cloud.settings
+        delay = settings["latency_ms"] + random.uniform(0, settings["jitter_ms"])
+        if delay:
+            time.sleep(delay / 1000)
+        if random.random() < settings["fail_rate"] and settings["fail_match"] in f"{self.command} {path}":
+            if hetzner:
+                return self.send_json(503, {"error": {"code": "unavailable", "message": "injected failure"}}, True)
+            return self.send_json(503, {"code": "ServiceUnavailable", "message": "injected failure"}, False)
+
+        query = parse_qs(url.query)
+        if hetzner:
+            status, payload = cloud.hetzner(self.command, path, query, body)
+        else:
+            status, payload = cloud.oci(self.command, path, query, body)
+        self.send_json(status, payload, hetzner)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = handle_request
+
+
+def start_server(cloud, port):
+    """Serve cloud on 127.0.0.1:port from a daemon thread and return the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.cloud = cloud
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def pop_option(args, name, default):
+    """Remove --name VALUE (or --name=VALUE) from args and return VALUE."""
+    for i, arg in enumerate(args):
+        if arg == f"--{name}":
+            if i + 1 >= len(args):
+                sys.exit(f"--{name} needs a value\n{USAGE}")
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        if arg.startswith(f"--{name}="):
+            del args[i]
+            return arg.partition("=")[2]
+    return default
+
+
+def make_cloud(args):
+    """Build the Cloud from the mock options in args; returns (cloud, port)."""
+    port = int(pop_option(args, "port", "8780"))
+    cloud = Cloud(
+        image=pop_option(args, "image", IMAGE),
+        vm_ip=pop_option(args, "vm-ip", None),
+        latency_ms=float(pop_option(args, "latency", "0")),
+        jitter_ms=float(pop_option(args, "jitter", "0")),
+        fail_rate=float(pop_option(args, "fail-rate", "0")),
+        fail_match=pop_option(args, "fail-match", ""),
+        boot_delay=float(pop_option(args, "boot-delay", "5")),
+    )
+    return cloud, port
+
+
+def cmd_serve(args):
+    cloud, port = make_cloud(args)
+    server = start_server(cloud, port)
+    print(f"Mock cloud on http://127.0.0.1:{port}")
+    print(f"  HCLOUD_ENDPOINT=http://127.0.0.1:{port}/v1")
+    print(f"  OCI_ENDPOINT=http://127.0.0.1:{port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nStopping, removing VM containers...")
+    finally:
+        server.shutdown()
+        cloud.cleanup()
+
+
+def bench_env(provider, port, key):
+    """Env file contents pointing provider at the mock on port."""
+    env = {}
+    for name in (f".{provider}.env", ".docker.env"):
+        if (REPO_DIR / name).exists():
+            env = load_env(REPO_DIR / name, [])
+            break
+    if key:
+        env["ADMIN_SSH_KEY"] = key
+    if not env.get("ADMIN_SSH_KEY"):
+        sys.exit("No ADMIN_SSH_KEY: pass --key or create the provider's or .docker.env file.")
+    if provider == "hetzner":
+        env.update({
+            "HCLOUD_TOKEN": "mock",
+            "HCLOUD_ENDPOINT": f"http://127.0.0.1:{port}/v1",
+            "HETZNER_SERVER_TYPE": "cx22",
+            "HETZNER_LOCATION": "fsn1",
+        })
+    else:
+        env.update({
+            "OCI_ENDPOINT": f"http://127.0.0.1:{port}",
+            "OCI_COMPARTMENT_OCID": MOCK_COMPARTMENT,
+            "OCI_IMAGE_OCID": "ocid1.image.oc1..mock",
+            "OCI_SUBNET_OCID": "ocid1.subnet.oc1..mock",
+            "OCI_BUCKET_NAME": "mock",
+            "OCI_SHAPE": "VM.Standard.E2.1.Micro",
+        })
+    return "".join(f"{k}={v}\n" for k, v in env.items())
+
+
+def cmd_bench(args):
+    cloud, port = make_cloud(args)
+    runs = int(pop_option(args, "runs", "1"))
+    key = pop_option(args, "key", None)
+    if not args or args[0] not in ("hetzner", "oci"):
+        sys.exit(USAGE)
+    provider, commands = args[0], args[1:] or BENCH_COMMANDS
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    env_file = LOG_DIR / f"mockcloud-{provider}.env"
+    env_file.write_text(bench_env(provider, port, key))
+    log_path = LOG_DIR / f"mockcloud-{provider}-{int(time.time())}.log"
+    server = start_server(cloud, port)
+    runner_env = {**os.environ, "RUNNER_ENV_FILE": str(env_file)}
+    timings = {cmd: [] for cmd in commands}
+    calls = {cmd: [] for cmd in commands}
+    last = {}
+    failed = None
+    try:
+        with open(log_path, "w") as log:
+            for run in range(1, runs + 1):
+                for cmd in commands:
+                    print(f"\r  run {run}/{runs}: {cmd}...{' ' * 20}", end="", flush=True)
+                    log.write(f"\n=== run {run}: {cmd}\n")
+                    log.flush()
+                    cloud.reset()
+                    start = time.monotonic()
+                    result = subprocess.run(
+                        [sys.executable, str(Path(__file__).parent / "runner.py"), provider, *cmd.split()],
+                        env=runner_env,
+                        stdout=log,
+                        stderr=subprocess.STDOUT,
+                    )
+                    timings[cmd].append(time.monotonic() - start)
+                    last[cmd] = cloud.stats()
+                    calls[cmd].append(last[cmd]["total"])
+                    if result.returncode != 0:
+                        failed = f"{cmd} (run {run}) exited with {result.returncode}"
+                        break
+                if failed:
+                    break
+    finally:
+        server.shutdown()
+        cloud.cleanup()
+        env_file.unlink(missing_ok=True)
+
+    print(f"\r{' ' * 60}\r{provider} against mockcloud, {runs} run(s):")
+    print(f"  {'command':<12} {'median':>8} {'min':>8} {'max':>8} {'API calls':>10} {'conns':>6}")
+    for cmd in commands:
+        if not timings[cmd]:
+            continue
+        t = timings[cmd]
+        print(
+            f"  {cmd:<12} {statistics.median(t):>7.2f}s {min(t):>7.2f}s {max(t):>7.2f}s"
+            f" {statistics.median(calls[cmd]):>10g} {last[cmd]['connections']:>6}"
+        )
+        routes = sorted(last[cmd]["requests"].items(), key=lambda item: -item[1])
+        if routes:
+            print("      " + ", ".join(f"{route} ×{n}" for route, n in routes))
+    print(f"\nRunner output: {log_path}")
+    if failed:
+        sys.exit(f"Failed: {failed}")
+
+
+def main():
+    args = sys.argv[1:]
+    cmd = args[0] if args else None
+    if cmd in (None, "help", "-h", "--help"):
+        print(USAGE)
+    elif cmd == "serve":
+        cmd_serve(args[1:])
+    elif cmd == "bench":
+        cmd_bench(args[1:])
+    else:
+        sys.exit(f"Unknown command: {cmd}\n{USAGE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+"""salt-ssh test runner: runner.py <provider> [command] [options]."""
+
+from saltrunner.cli import main
+
+if __name__ == "__main__":
+    main()
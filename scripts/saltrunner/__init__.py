@@ -0,0 +1,6 @@
+"""Shared salt-ssh test runner: one CLI over pluggable target providers.
+
+The roster, secrets, streaming salt-ssh output, SSH multiplexing and
+incremental runs are implemented once here; providers (docker, hetzner,
+oci, local) only know how to produce an SSH-reachable target.
+"""
@@ -0,0 +1,186 @@
+"""Highstate benchmarks: cold and warm runs, a JSONL history and baseline gating."""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from .common import REPO_DIR
+from .saltssh import run_with_spinner, salt_ssh_cmd, thin_tarball
+from .ssh import ssh_bytes
+from .transfer import state_bundle
+
+BENCH_DIR = REPO_DIR / ".salt" / "bench"
+RESULTS = BENCH_DIR / "results.jsonl"
+STATE_NOISE_MS = 250  # per-state slowdowns below this are never regressions
+
+
+def git_revision():
+    """Short HEAD commit, suffixed with -dirty when the tree has local changes."""
+    rev = subprocess.run(
+        ["git", "-C", str(REPO_DIR), "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    dirty = subprocess.run(
+        ["git", "-C", str(REPO_DIR), "status", "--porcelain", "--untracked-files=no"],
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    return f"{rev}-dirty" if rev and dirty else rev or "unknown"
+
+
+def timed_highstate(provider, target, kind):
+    """Run one highstate and return its benchmark record."""
+    before = ssh_bytes(target.host, target.port)
+    start = time.monotonic()
+    results = run_with_spinner(
+        salt_ssh_cmd(provider.minion_id, "state.highstate"),
+        provider.minion_id,
+        label=f"Benchmark: {kind} highstate",
+        exit_on_error=False,
+    )
+    wall = time.monotonic() - start
+    after = ssh_bytes(target.host, target.port)
+    states = (results or {}).get(provider.minion_id)
+    if not isinstance(states, list):
+        sys.exit(f"Benchmark {kind} run returned no state results.")
+    thin = thin_tarball()
+    bundle_bytes, _ = state_bundle(None)
+    return {
+        "kind": kind,
+        "wall_s": round(wall, 3),
+        "state_ms": round(sum(s.duration for s in states), 1),
+        "states": {f"{s.function} {s.id}": round(s.duration, 1) for s in states},
+        "changed": sum(1 for s in states if s.changes),
+        "failed": sum(1 for s in states if s.result is False),
+        "ssh_sent": after[0] - before[0] if before and after else None,
+        "ssh_received": after[1] - before[1] if before and after else None,
+        "thin_bytes": thin.stat().st_size if thin.exists() else None,
+        "bundle_bytes": bundle_bytes,
+    }
+
+
+def summarize_runs(records):
+    """Median wall time, state time, SSH bytes and per-state durations per run kind."""
+    summary = {}
+    for kind in ("cold", "warm"):
+        runs = [r for r in records if r["kind"] == kind]
+        if not runs:
+            continue
+        state_ids = {sid for r in runs for sid in r["states"]}
+        summary[kind] = {
+            "runs": len(runs),
+            "wall_s": statistics.median(r["wall_s"] for r in runs),
+            "state_ms": statistics.median(r["state_ms"] for r in runs),
+            "ssh_bytes": statistics.median(
+                (r["ssh_sent"] or 0) + (r["ssh_received"] or 0) for r in runs
+            ),
+            "changed": max(r["changed"] for r in runs),
+            "states": {
+                sid: statistics.median(r["states"].get(sid, 0) for r in runs)
+                for sid in state_ids
+            },
+        }
+    return summary
+
+
+def regressions(summary, baseline, threshold):
+    """List (what, baseline, now) entries more than threshold percent slower than baseline.
+
+    Whole-run wall time is compared per kind; single states only when they
+    slowed down by more than STATE_NOISE_MS as well.
+    """
+    factor = 1 + threshold / 100
+    found = []
+    for kind, now in summary.items():
+        base = baseline.get("kinds", {}).get(kind)
+        if not base:
+            continue
+        if now["wall_s"] > base["wall_s"] * factor:
+            found.append((f"{kind} wall time", f"{base['wall_s']:.1f} s", f"{now['wall_s']:.1f} s"))
+        for sid, ms in sorted(now["states"].items(), key=lambda item: -item[1]):
+            base_ms = base["states"].get(sid)
+            if base_ms is None:
+                if ms > STATE_NOISE_MS:
+                    found.append((f"{kind} {sid} (new)", "-", f"{ms:.0f} ms"))
+            elif ms > base_ms * factor and ms - base_ms > STATE_NOISE_MS:
+                found.append((f"{kind} {sid}", f"{base_ms:.0f} ms", f"{ms:.0f} ms"))
+    return found
+
+
+def print_summary(summary, baseline):
+    print(f"\n{'':6} {'runs':>5} {'wall':>9} {'states':>9} {'ssh':>10} {'changed':>8}")
+    for kind, s in summary.items():
+        base = baseline.get("kinds", {}).get(kind) if baseline else None
+        delta = ""
+        if base and base["wall_s"]:
+            delta = f"  ({(s['wall_s'] / base['wall_s'] - 1) * 100:+.0f}% vs baseline)"
+        print(
+            f"{kind:6} {s['runs']:>5} {s['wall_s']:>8.1f}s {s['state_ms'] / 1000:>8.1f}s"
+            f" {s['ssh_bytes'] / 2**20:>7.1f}MiB {s['changed']:>8}{delta}"
+        )
+    if summary.get("warm", {}).get("changed"):
+        print("\n⚠  Warm runs reported changes; the highstate is not idempotent.")
+
+
+def run_benchmark(provider, runs=3, cold=True, warm=True, threshold=20.0, save_baseline=False):
+    """Run the benchmark, append every run to RESULTS and gate against the baseline.
+
+    Each iteration resets the target (cold) and/or re-applies on the
+    converged target (warm).  Exits 1 when a median regresses by more than
+    threshold percent against the saved baseline.
+    """
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    revision = git_revision()
+    thin = thin_tarball()
+    baseline_path = BENCH_DIR / f"baseline-{provider.name}.json"
+    records = []
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    for i in range(1, runs + 1):
+        print(f"\n— Iteration {i}/{runs}")
+        if cold:
+            provider.reset_target()
+        with provider.target() as target:
+            provider.connect(target)
+            kinds = (["cold"] if cold else []) + (["warm"] if warm else [])
+            for kind in kinds:
+                record = timed_highstate(provider, target, kind)
+                record.update(
+                    run_id=run_id,
+                    provider=provider.name,
+                    revision=revision,
+                    iteration=i,
+                    time=time.time(),
+                )
+                records.append(record)
+                with open(RESULTS, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    summary = summarize_runs(records)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    print_summary(summary, baseline)
+    if thin.exists():
+        print(f"\nThin tarball: {thin.stat().st_size / 2**20:.1f} MiB")
+    if records:
+        print(f"State files (gzipped estimate): {records[-1]['bundle_bytes'] / 1024:.1f} KiB")
+    print(f"Results: {RESULTS} (run {run_id})")
+
+    if save_baseline:
+        baseline_path.write_text(json.dumps(
+            {"run_id": run_id, "revision": revision, "provider": provider.name, "kinds": summary},
+            indent=2,
+        ) + "\n")
+        print(f"Saved as baseline: {baseline_path}")
+        return
+    if not baseline:
+        print("No baseline yet; save one with --save-baseline.")
+        return
+    found = regressions(summary, baseline, threshold)
+    if found:
+        print(f"\n✗  {len(found)} regression(s) over {threshold:g}% vs baseline {baseline['revision']}:")
+        for what, before, now in found:
+            print(f"  {what}: {before} → {now}")
+        sys.exit(1)
+    print(f"\n✓  Within {threshold:g}% of baseline {baseline['revision']}.")
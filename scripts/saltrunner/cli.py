@@ -0,0 +1,276 @@
+"""Command-line entry point shared by runner.py and the test-*.py wrappers."""
+
+import atexit
+import gzip
+import shutil
+import sys
+import time
+
+from .bench import run_benchmark
+from .common import LOG_DIR, run
+from .incremental import incremental_plan, save_incremental
+from .logstore import MAX_AGE_DAYS, MAX_BYTES, find_log, prune, query
+from .providers import PROVIDERS, get_provider
+from .results import idempotency_report, profile_report, write_collapsed_stacks
+from .saltssh import cleanup_roster, run_with_spinner, salt_ssh_cmd
+from .secretfiles import cleanup_secrets
+from .ssh import ssh_bench, start_control_master
+from .transfer import measured_transfer
+
+USAGE = f"""\
+Usage: runner.py <provider> [command] [options]
+
+Providers: {", ".join(PROVIDERS)}
+
+Run `runner.py <provider> help` for the provider's commands and
+`runner.py logs help` for querying stored run logs.  The
+test-docker.py, test-hetzner.py and test-oci.py scripts are shortcuts for
+`runner.py docker|hetzner|oci`.\
+"""
+
+
+def cmd_check(provider, state="base.hostname", fail_fast=False, pool=False):
+    with provider.target(pool) as target:
+        provider.connect(target)
+        with measured_transfer(provider.minion_id, target, state.split(",")):
+            run_with_spinner(
+                salt_ssh_cmd(
+                    provider.minion_id,
+                    "state.apply", state,
+                    *(["failhard=True"] if fail_fast else []),
+                ),
+                provider.minion_id,
+                label=f"Checking {state}",
+            )
+
+
+def cmd_test(provider, fail_fast=False, pool=False, incremental=False):
+    with provider.target(pool) as target:
+        sock = provider.connect(target)
+        if incremental:
+            plan, dirty = incremental_plan(provider.minion_id, target.host, sock)
+        else:
+            plan, dirty = None, None
+        if dirty is not None:
+            if not dirty:
+                print("Nothing changed since the last successful run; nothing to apply.")
+                return
+            applied = dirty
+            args = ["state.apply", ",".join(dirty)]
+            label = f"Applying {len(dirty)} changed SLS (incremental)"
+        else:
+            highstate = provider.highstate(target)
+            if highstate is None:
+                return
+            args, label, applied = highstate
+        with measured_transfer(provider.minion_id, target, applied):
+            results = run_with_spinner(
+                salt_ssh_cmd(
+                    provider.minion_id,
+                    *args,
+                    *(["failhard=True"] if fail_fast else []),
+                ),
+                provider.minion_id,
+                label=label,
+            )
+        if plan:
+            save_incremental(plan, provider.minion_id, applied, results)
+
+
+def cmd_profile(provider, top="15"):
+    with provider.target() as target:
+        provider.connect(target)
+        results = run_with_spinner(
+            salt_ssh_cmd(provider.minion_id, "state.highstate"),
+            provider.minion_id,
+            label="Profiling highstate",
+            exit_on_error=False,
+        )
+    states = (results or {}).get(provider.minion_id)
+    if not isinstance(states, list) or not states:
+        sys.exit("No state results to profile.")
+    profile_report(states, int(top))
+    folded = LOG_DIR / f"profile-{int(time.time())}.folded"
+    write_collapsed_stacks(states, folded)
+    print(f"\nCollapsed stacks: {folded}  (render with flamegraph.pl or speedscope)")
+
+
+def cmd_verify_idempotent(provider, top="15"):
+    with provider.target() as target:
+        provider.connect(target)
+        run_with_spinner(
+            salt_ssh_cmd(provider.minion_id, "state.highstate"),
+            provider.minion_id,
+            label="Converging (run 1 of 2)",
+        )
+        start = time.monotonic()
+        results = run_with_spinner(
+            salt_ssh_cmd(provider.minion_id, "state.highstate"),
+            provider.minion_id,
+            label="Re-applying (run 2 of 2)",
+            exit_on_error=False,
+        )
+        wall = time.monotonic() - start
+    states = (results or {}).get(provider.minion_id)
+    if not isinstance(states, list) or not states:
+        sys.exit("No state results from the second run.")
+    changed = idempotency_report(states, int(top))
+    failed = [s.id for s in states if s.result is False]
+    print(f"\nSecond run: {wall:.1f}s wall, {sum(s.duration for s in states) / 1000:.1f}s in states")
+    if changed or failed:
+        sys.exit(f"✗  Not idempotent: {len(changed)} changed, {len(failed)} failed on the second run.")
+    print("✓  Idempotent: the second run changed nothing.")
+
+
+def cmd_bench(provider, runs="3", cold=True, warm=True, threshold="20", save_baseline=False):
+    run_benchmark(
+        provider,
+        runs=int(runs),
+        cold=cold,
+        warm=warm,
+        threshold=float(threshold),
+        save_baseline=save_baseline,
+    )
+
+
+def cmd_ssh(provider):
+    target = provider.existing_target()
+    sock = start_control_master(provider.env, target.host, target.port)
+    run(["ssh", "-S", str(sock), "-p", str(target.port), f"admin@{target.host}"])
+
+
+def cmd_ssh_bench(provider, runs="5"):
+    with provider.target() as target:
+        ssh_bench(provider.env, provider.minion_id, target.host, target.port, int(runs))
+
+
+LOGS_USAGE = """\
+Usage: logs [filters]           List indexed runs, newest first
+       logs show <run-id>       Print a run's log (a unique run-id prefix is enough)
+       logs prune [--days=N] [--max-mb=N]
+                                Apply retention now (default: 30 days, 200 MiB)
+
+Filters:
+  --failed         Only runs with failed states or a nonzero exit
+  --state=GLOB     Only runs in which a state ID matching GLOB failed
+  --minion=GLOB    Only runs against matching minion IDs
+  --since=AGE      Only runs started within AGE (e.g. 90m, 36h, 7d)
+  --slowest        Sort by duration instead of start time
+  --limit=N        Show at most N runs (default: 20, 0 for all)\
+"""
+
+
+def parse_age(age):
+    """Seconds in an age like 90m, 36h or 7d (bare numbers are days)."""
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if age[-1:] in units:
+        return float(age[:-1]) * units[age[-1]]
+    return float(age) * 86400
+
+
+def cmd_logs(argv):
+    options = dict(a[2:].partition("=")[::2] for a in argv if a.startswith("--"))
+    args = [a for a in argv if not a.startswith("--")]
+    if args[:1] == ["help"]:
+        print(LOGS_USAGE)
+    elif args[:1] == ["show"]:
+        path = find_log(args[1]) if len(args) > 1 else None
+        if not path:
+            sys.exit(f"No unique stored run matches {args[1:] or 'nothing'}.")
+        with gzip.open(path, "rt") as log:
+            shutil.copyfileobj(log, sys.stdout)
+    elif args[:1] == ["prune"]:
+        removed = prune(
+            max_age_days=float(options.get("days") or MAX_AGE_DAYS),
+            max_bytes=float(options.get("max-mb") or MAX_BYTES / 2**20) * 2**20,
+        )
+        print(f"Removed {removed} run(s).")
+    elif args:
+        sys.exit(f"Unknown logs command: {args[0]}\n{LOGS_USAGE}")
+    else:
+        since = options.get("since")
+        entries = query(
+            failed="failed" in options,
+            state=options.get("state"),
+            minion=options.get("minion"),
+            since=time.time() - parse_age(since) if since else None,
+            slowest="slowest" in options,
+            limit=int(options.get("limit") or 20),
+        )
+        if not entries:
+            print("No matching runs.")
+            return
+        print(f"{'run id':<24} {'started':<16} {'minion':<18} {'time':>7}  {'ok':>4} {'chg':>4} {'fail':>4}  label")
+        for e in entries:
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(e["time"]))
+            status = "✗" if e["failed"] or e["returncode"] else " "
+            print(
+                f"{e['run_id']:<24} {started:<16} {e['minion']:<18} {e['duration']:>6.0f}s"
+                f"  {e['succeeded']:>4} {e['changed']:>4} {e['failed']:>4} {status} {e['label']}"
+            )
+            for state_id in e["failed_ids"][:5]:
+                print(f"{'':>26}FAILED: {state_id}")
+            if e.get("error"):
+                print(f"{'':>26}ERROR: {e['error'].splitlines()[0][:100]}")
+
+
+def main(provider_name=None, prog=None):
+    """Dispatch sys.argv to a provider; provider_name is preset by the wrappers."""
+    argv = sys.argv[1:]
+    if provider_name is None:
+        if not argv or argv[0] in ("help", "-h", "--help"):
+            print(USAGE)
+            return
+        if argv[0] == "logs":
+            cmd_logs(argv[1:])
+            return
+        provider_name, argv = argv[0], argv[1:]
+        prog = f"runner.py {provider_name}"
+    provider_cls = get_provider(provider_name)
+    usage = provider_cls.usage.format(prog=prog or f"runner.py {provider_name}")
+
+    cmd = argv[0] if argv else None
+    if cmd is None or cmd in ("help", "-h", "--help"):
+        print(usage)
+        return
+    if cmd == "logs":
+        cmd_logs(argv[1:])
+        return
+
+    # env_free commands get an empty env, so env lookups fall back to defaults
+    env = {} if cmd in provider_cls.env_free else provider_cls.load_env()
+    provider = provider_cls(env)
+    atexit.register(cleanup_secrets)
+    atexit.register(cleanup_roster)
+
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    fail_fast = "--fail-fast" in argv[1:]
+    pool = "--pool" in argv[1:]
+    incremental = "--incremental" in argv[1:]
+    threshold = next((a.partition("=")[2] for a in argv[1:] if a.startswith("--threshold=")), "20")
+
+    if cmd == "check":
+        cmd_check(provider, *args, fail_fast=fail_fast, pool=pool)
+    elif cmd == "test":
+        cmd_test(provider, fail_fast=fail_fast, pool=pool, incremental=incremental)
+    elif cmd == "profile":
+        cmd_profile(provider, *args)
+    elif cmd == "verify-idempotent":
+        cmd_verify_idempotent(provider, *args)
+    elif cmd == "bench":
+        cmd_bench(
+            provider,
+            *args,
+            cold="--warm-only" not in argv[1:],
+            warm="--cold-only" not in argv[1:],
+            threshold=threshold,
+            save_baseline="--save-baseline" in argv[1:],
+        )
+    elif cmd == "ssh":
+        cmd_ssh(provider)
+    elif cmd == "ssh-bench":
+        cmd_ssh_bench(provider, *args)
+    elif cmd in provider.commands:
+        getattr(provider, provider.commands[cmd])(*args)
+    else:
+        sys.exit(f"Unknown command: {cmd}\n{usage}")
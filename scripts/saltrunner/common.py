@@ -0,0 +1,87 @@
+"""Repository paths, env-file loading, JSON caches and subprocess helpers."""
+
+import json
+import os
+import stat
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent.parent
+SALT_DIR = REPO_DIR / "salt"
+STATES_DIR = SALT_DIR / "states"
+SECRETS_DIR = SALT_DIR / "pillar" / "secrets"
+ROSTER = SALT_DIR / "roster"
+LOG_DIR = REPO_DIR / ".salt" / "tmp"
+CACHE_DIR = REPO_DIR / ".salt" / "cache"
+
+
+def load_env(path, required, hint=""):
+    """Load KEY=VALUE configuration from path, exit if a required key is missing."""
+    if not path.exists():
+        sys.exit(f"Missing config file: {path}" + (f"\n{hint}" if hint else ""))
+    env = {}
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            key, _, value = line.partition("=")
+            env[key.strip()] = value.strip()
+    missing = [k for k in required if not env.get(k)]
+    if missing:
+        sys.exit(f"Missing required values in {path}: {', '.join(missing)}")
+    return env
+
+
+def read_cache(path, key, ttl):
+    """Return the entry stored under key in a JSON cache file if younger than ttl seconds."""
+    try:
+        entry = json.loads(path.read_text()).get(key)
+    except (OSError, ValueError):
+        return None
+    if entry and time.time() - entry["cached_at"] < ttl:
+        return entry
+    return None
+
+
+def write_cache(path, key, entry):
+    """Store entry under key in a JSON cache file, or drop the key when entry is None."""
+    try:
+        entries = json.loads(path.read_text())
+    except (OSError, ValueError):
+        entries = {}
+    if entry:
+        entries[key] = {**entry, "cached_at": time.time()}
+    else:
+        entries.pop(key, None)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(entries, indent=2) + "\n")
+
+
+def private_dir(path):
+    """Create path mode 0700 if it does not exist, and return it.
+
+    Exits unless path is a real directory (not a symlink) owned by the
+    current user with mode 0700, so a directory or link another user planted
+    under a shared /tmp or /dev/shm is never used.
+    """
+    try:
+        path.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+        sys.exit(f"Refusing to use {path}: not a directory owned by uid {os.getuid()} with mode 0700")
+    return path
+
+
+def admin_key(env):
+    """Expanded path of the admin SSH private key."""
+    return str(Path(env["ADMIN_SSH_KEY"]).expanduser())
+
+
+def run(cmd, **kwargs):
+    """Run a command, exit on failure."""
+    result = subprocess.run(cmd, **kwargs)
+    if result.returncode != 0:
+        sys.exit(result.returncode)
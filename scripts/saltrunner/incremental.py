@@ -0,0 +1,221 @@
+"""Incremental highstate: fingerprint SLS modules and apply only the dirty ones."""
+
+import hashlib
+import json
+import re
+import subprocess
+import sys
+
+from .common import CACHE_DIR, SALT_DIR, STATES_DIR
+from .saltssh import salt_ssh_cmd
+
+INCREMENTAL_DIR = CACHE_DIR / "incremental"
+INCREMENTAL_ALWAYS = ["base.preflight"]  # secrets gate, runs with every incremental apply
+
+PILLAR_REF = re.compile(
+    r"""pillar(?:\.get'\]\(|\.get\(|\[)\s*['"]([^'"]+)['"]"""
+    r"""|contents_pillar:\s*['"]?([^'"\s]+)"""
+)
+REQUISITE = re.compile(r"^(\s+)- (require|watch|onchanges|onfail|listen|prereq|use)(_in)?:\s*$")
+REACTIVE = {"watch", "onchanges", "onfail", "listen", "prereq"}
+
+
+def secure_linux_states():
+    """Return the SLS modules included by secure_linux/init.sls, in order."""
+    init = STATES_DIR / "secure_linux" / "init.sls"
+    return re.findall(r"^\s+-\s+(\S+)\s*$", init.read_text(), re.MULTILINE)
+
+
+def sls_file(sls):
+    """Path of an SLS module (dotted name) under salt/states."""
+    path = STATES_DIR.joinpath(*sls.split("."))
+    flat = path.parent / f"{path.name}.sls"
+    return flat if flat.exists() else path / "init.sls"
+
+
+def scan_sls(sls):
+    """Scan an SLS file for includes, state IDs/names, requisites, sources and pillar keys.
+
+    Requisites are (kind, is_in, module, target) tuples.  Only literal values
+    are picked up; anything rendered by Jinja is ignored.
+    """
+    text = sls_file(sls).read_text()
+    scan = {"includes": [], "ids": set(), "requisites": [], "sources": set(), "pillar": set()}
+    block = None  # "include", or (indent, kind, is_in) inside a requisite list
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if block == "include" and (m := re.match(r"^\s+-\s+(\S+)\s*$", line)):
+            scan["includes"].append(m.group(1))
+            continue
+        if isinstance(block, tuple):
+            m = re.match(r"^(\s+)- (\w+):\s*(.+?)\s*$", line)
+            if m and len(m.group(1)) > block[0]:
+                if "{{" not in m.group(3):
+                    scan["requisites"].append((block[1], block[2], m.group(2), m.group(3)))
+                continue
+        block = None
+        if line.startswith("include:"):
+            block = "include"
+        elif m := re.match(r"^([^\s#{%][^:]*?):\s*$", line):
+            if "{{" not in m.group(1):
+                scan["ids"].add(m.group(1))
+        elif m := re.match(r"^\s+- name:\s*(.+?)\s*$", line):
+            if "{{" not in m.group(1):
+                scan["ids"].add(m.group(1))
+        elif m := REQUISITE.match(line):
+            block = (len(m.group(1)), m.group(2), bool(m.group(3)))
+    scan["sources"] = set(re.findall(r"salt://([^\s'\"]+)", text))
+    scan["pillar"] = {key for groups in PILLAR_REF.findall(text) for key in groups if key}
+    return scan
+
+
+def sls_modules(roots=None):
+    """Return roots (default: the secure_linux modules) plus everything they include, in order."""
+    modules = []
+    queue = list(roots) if roots else secure_linux_states()
+    while queue:
+        sls = queue.pop(0)
+        if sls not in modules and sls_file(sls).exists():
+            modules.append(sls)
+            queue.extend(scan_sls(sls)["includes"])
+    return modules
+
+
+def sls_graph(scans):
+    """Return the requisite graph of scanned SLS modules as two adjacency dicts.
+
+    needs[a] holds the modules a's states reference (they must be in the same
+    run); reacts[a] holds the modules with states that watch/onchanges/listen
+    to a's states (they must re-run when a changes).
+    """
+    owner = {}
+    for sls, scan in scans.items():
+        for state_id in scan["ids"]:
+            owner.setdefault(state_id, set()).add(sls)
+    needs = {sls: set(scan["includes"]) & set(scans) for sls, scan in scans.items()}
+    reacts = {sls: set() for sls in scans}
+    for sls, scan in scans.items():
+        for kind, is_in, module, ref in scan["requisites"]:
+            targets = {ref} if module == "sls" else owner.get(ref, set())
+            for other in (targets & set(scans)) - {sls}:
+                needs[sls].add(other)
+                if kind in REACTIVE:
+                    if is_in:
+                        reacts[sls].add(other)
+                    else:
+                        reacts[other].add(sls)
+    return needs, reacts
+
+
+def follow_edges(start, edges):
+    """Return start plus every node reachable from it through edges."""
+    seen, queue = set(start), list(start)
+    while queue:
+        for other in edges.get(queue.pop(), ()):
+            if other not in seen:
+                seen.add(other)
+                queue.append(other)
+    return seen
+
+
+def pillar_value(pillar, key):
+    """Look up a colon-delimited pillar key like pillar.get does (None if absent)."""
+    value = pillar
+    for part in key.split(":"):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def sls_fingerprints(scans, pillar):
+    """Return {sls: sha256} over each SLS file, its salt:// sources and the pillar values they read.
+
+    The "_global" entry covers the top files and master config; when it
+    changes every module is dirty.
+    """
+    fingerprints = {}
+    digest = hashlib.sha256()
+    for path in (STATES_DIR / "top.sls", sls_file("secure_linux"), SALT_DIR / "master"):
+        digest.update(path.read_bytes())
+    fingerprints["_global"] = digest.hexdigest()
+    for sls, scan in scans.items():
+        digest = hashlib.sha256(sls_file(sls).read_bytes())
+        keys = set(scan["pillar"])
+        for source in sorted(scan["sources"]):
+            path = STATES_DIR / source
+            data = path.read_bytes() if path.is_file() else b""
+            digest.update(source.encode() + b"\0" + data)
+            keys.update(k for groups in PILLAR_REF.findall(data.decode(errors="replace")) for k in groups if k)
+        for key in sorted(keys):
+            value = json.dumps(pillar_value(pillar, key), sort_keys=True, default=str)
+            digest.update(key.encode() + b"\0" + value.encode())
+        fingerprints[sls] = digest.hexdigest()
+    return fingerprints
+
+
+def target_machine_id(host, sock):
+    """Read /etc/machine-id from the target through its ControlMaster."""
+    result = subprocess.run(
+        ["ssh", "-S", str(sock), f"admin@{host}", "cat /etc/machine-id"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def fetch_pillar(minion_id):
+    """Return a minion's rendered pillar (salt-ssh pillar.items)."""
+    result = subprocess.run(salt_ssh_cmd(minion_id, "pillar.items"), capture_output=True, text=True)
+    try:
+        pillar = json.loads(result.stdout).get(minion_id)
+    except (json.JSONDecodeError, AttributeError):
+        pillar = None
+    if result.returncode != 0 or not isinstance(pillar, dict):
+        sys.exit(f"pillar.items failed:\n{result.stdout}{result.stderr}")
+    return pillar
+
+
+def incremental_plan(minion_id, host, sock):
+    """Compare current fingerprints with those recorded after the last clean run.
+
+    Returns (plan, dirty).  dirty lists the SLS modules to apply in highstate
+    order: changed modules, modules reacting to them, and everything those
+    reference.  It is None when a full run is needed (no record for this
+    machine, or the top files changed).
+    """
+    modules = sls_modules()
+    scans = {sls: scan_sls(sls) for sls in modules}
+    path = INCREMENTAL_DIR / f"{minion_id}.json"
+    try:
+        record = json.loads(path.read_text())
+    except (OSError, ValueError):
+        record = {}
+    machine_id = target_machine_id(host, sock)
+    recorded = record.get("sls", {}) if machine_id and record.get("machine_id") == machine_id else {}
+    fingerprints = sls_fingerprints(scans, fetch_pillar(minion_id))
+    plan = {"path": path, "machine_id": machine_id, "recorded": recorded, "fingerprints": fingerprints}
+    if recorded.get("_global") != fingerprints["_global"]:
+        print("Incremental: no record for this target (or top files changed), running in full.")
+        return plan, None
+    changed = {sls for sls in modules if recorded.get(sls) != fingerprints[sls]}
+    needs, reacts = sls_graph(scans)
+    dirty = follow_edges(follow_edges(changed, reacts), needs)
+    if dirty:
+        dirty |= set(INCREMENTAL_ALWAYS) & set(modules)
+    if changed:
+        print(f"Incremental: changed {', '.join(sorted(changed))}")
+    return plan, [sls for sls in modules if sls in dirty]
+
+
+def save_incremental(plan, minion_id, applied, results):
+    """Record the fingerprints of the applied SLS modules if no state failed."""
+    states = (results or {}).get(minion_id)
+    if not isinstance(states, list) or any(state.result is False for state in states):
+        return
+    recorded = {**plan["recorded"], "_global": plan["fingerprints"]["_global"]}
+    for sls in applied:
+        recorded[sls] = plan["fingerprints"][sls]
+    plan["path"].parent.mkdir(parents=True, exist_ok=True)
+    plan["path"].write_text(json.dumps({"machine_id": plan["machine_id"], "sls": recorded}, indent=2) + "\n")
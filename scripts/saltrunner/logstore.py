@@ -0,0 +1,166 @@
+"""Compressed run-log store with a JSONL index and size/age retention.
+
+Each salt-ssh run gets a unique run ID; its raw JSON and rendered log are
+gzipped into LOG_STORE, and one index line per minion records what the
+`logs` command filters on, so queries never decompress a log.
+"""
+
+import fcntl
+import fnmatch
+import gzip
+import json
+import os
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+
+from .common import REPO_DIR
+
+LOG_STORE = REPO_DIR / ".salt" / "logs"
+INDEX = LOG_STORE / "index.jsonl"
+MAX_AGE_DAYS = 30
+MAX_BYTES = 200 * 2**20
+
+
+def new_run_id():
+    """Sortable, collision-free run ID: UTC timestamp plus random suffix."""
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + secrets.token_hex(3)
+
+
+@contextmanager
+def index_lock():
+    """Serialize index writers (parallel runs, pruning) with an flock."""
+    LOG_STORE.mkdir(parents=True, exist_ok=True)
+    with open(LOG_STORE / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def run_entry(run_id, minion, states, command, label, started, duration, returncode):
+    """Index entry for one minion's part of a run.
+
+    states is a StateResult list, or the minion's output for non-state
+    functions and errors; that output is kept as the error when the run
+    failed.
+    """
+    entry = {
+        "run_id": run_id,
+        "time": round(started, 3),
+        "minion": minion,
+        "command": command,
+        "label": label,
+        "duration": round(duration, 3),
+        "returncode": returncode,
+    }
+    if isinstance(states, list):
+        failed_ids = [s.id for s in states if s.result is False]
+        entry.update(
+            succeeded=len(states) - len(failed_ids),
+            changed=sum(1 for s in states if s.changes),
+            failed=len(failed_ids),
+            failed_ids=failed_ids,
+            state_ms=round(sum(s.duration for s in states), 1),
+        )
+    else:
+        entry.update(succeeded=0, changed=0, failed=0, failed_ids=[])
+        if returncode:
+            entry["error"] = str(states or "no output")[:500]
+    return entry
+
+
+def store_run(run_id, json_path, log_text, entries):
+    """Gzip a run's raw JSON and rendered log into the store and index it.
+
+    The working JSON file is removed.  Retention is applied afterwards.
+    Returns the path of the compressed log.
+    """
+    LOG_STORE.mkdir(parents=True, exist_ok=True)
+    log_path = LOG_STORE / f"{run_id}.log.gz"
+    with gzip.open(log_path, "wt") as log:
+        log.write(log_text)
+    if json_path.exists():
+        with open(json_path, "rb") as raw, gzip.open(LOG_STORE / f"{run_id}.json.gz", "wb") as packed:
+            shutil.copyfileobj(raw, packed)
+        json_path.unlink()
+    with index_lock(), open(INDEX, "a") as index:
+        index.writelines(json.dumps(entry) + "\n" for entry in entries)
+    prune()
+    return log_path
+
+
+def read_index():
+    """All index entries, oldest first."""
+    try:
+        with open(INDEX) as index:
+            return [json.loads(line) for line in index if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def run_files(run_id):
+    return [LOG_STORE / f"{run_id}.log.gz", LOG_STORE / f"{run_id}.json.gz"]
+
+
+def prune(max_age_days=MAX_AGE_DAYS, max_bytes=MAX_BYTES):
+    """Drop runs older than max_age_days, then the oldest until the store fits max_bytes.
+
+    Returns the number of runs removed.
+    """
+    with index_lock():
+        entries = read_index()
+        runs = {}
+        for entry in entries:
+            runs.setdefault(entry["run_id"], entry["time"])
+        cutoff = time.time() - max_age_days * 86400
+        sizes = {
+            run_id: sum(f.stat().st_size for f in run_files(run_id) if f.exists())
+            for run_id in runs
+        }
+        total = sum(sizes.values())
+        removed = set()
+        for run_id, started in sorted(runs.items(), key=lambda item: item[1]):
+            if started >= cutoff and total <= max_bytes:
+                break
+            removed.add(run_id)
+            total -= sizes[run_id]
+        if not removed:
+            return 0
+        for run_id in removed:
+            for f in run_files(run_id):
+                f.unlink(missing_ok=True)
+        kept = INDEX.with_suffix(".tmp")
+        with open(kept, "w") as index:
+            index.writelines(json.dumps(e) + "\n" for e in entries if e["run_id"] not in removed)
+        os.replace(kept, INDEX)
+        return len(removed)
+
+
+def query(failed=False, state=None, minion=None, since=None, slowest=False, limit=20):
+    """Index entries matching the filters, newest (or with slowest, longest) first.
+
+    state is a glob matched against failed state IDs; since an epoch time.
+    """
+    entries = read_index()
+    if failed:
+        entries = [e for e in entries if e["failed"] or e.get("error") or e["returncode"]]
+    if state:
+        entries = [e for e in entries if any(fnmatch.fnmatch(s, state) for s in e["failed_ids"])]
+    if minion:
+        entries = [e for e in entries if fnmatch.fnmatch(e["minion"], minion)]
+    if since:
+        entries = [e for e in entries if e["time"] >= since]
+    if slowest:
+        entries.sort(key=lambda e: e["duration"], reverse=True)
+    else:
+        entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def find_log(run_id):
+    """Path of the compressed log for a run ID or unique prefix, or None."""
+    matches = sorted({e["run_id"] for e in read_index() if e["run_id"].startswith(run_id)})
+    if len(matches) != 1:
+        return None
+    path = LOG_STORE / f"{matches[0]}.log.gz"
+    return path if path.exists() else None
@@ -0,0 +1,18 @@
+"""Target providers, imported by name only when selected.
+
+Each module defines a ``Provider`` subclass of ``base.Provider``.  Keeping
+the import lazy means e.g. the OCI SDK is never loaded for the docker
+provider or for ``help``.
+"""
+
+import importlib
+import sys
+
+PROVIDERS = ("docker", "hetzner", "oci", "local")
+
+
+def get_provider(name):
+    """Return the Provider class of the named provider, exit if unknown."""
+    if name not in PROVIDERS:
+        sys.exit(f"Unknown provider: {name} (choose from {', '.join(PROVIDERS)})")
+    return importlib.import_module(f"{__name__}.{name}").Provider
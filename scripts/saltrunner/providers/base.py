@@ -0,0 +1,79 @@
+"""Provider interface shared by all test target backends."""
+
+import os
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..common import REPO_DIR, load_env
+from ..incremental import sls_modules
+from ..saltssh import write_roster
+from ..secretfiles import decrypt_secrets
+from ..ssh import start_control_master
+
+
+@dataclass
+class Target:
+    """An SSH-reachable test machine."""
+
+    host: str
+    port: int
+    name: str
+
+
+class Provider:
+    """A backend that supplies the test target for one minion ID.
+
+    Subclasses set the class attributes and implement target(); extra CLI
+    commands map a command name to a method taking the positional args.
+    """
+
+    name = ""
+    minion_id = ""
+    env_file = ""  # relative to the repo root
+    env_hint = ""
+    required = ["ADMIN_SSH_KEY"]
+    usage = ""  # help text, {prog} is replaced by the invoking command
+    commands = {}  # command name -> method name
+    env_free = ()  # commands that run without an env file
+
+    def __init__(self, env):
+        self.env = env
+
+    @classmethod
+    def load_env(cls):
+        """Load this provider's env file, or the one named by RUNNER_ENV_FILE."""
+        path = Path(os.environ.get("RUNNER_ENV_FILE") or REPO_DIR / cls.env_file)
+        return load_env(path, cls.required, cls.env_hint)
+
+    @contextmanager
+    def target(self, pool=False):
+        """Yield a ready Target, creating the machine if needed."""
+        raise NotImplementedError
+
+    def existing_target(self):
+        """Return the Target for an interactive ssh session, exit if there is none."""
+        with self.target() as target:
+            return target
+
+    def reset_target(self):
+        """Replace the target with a freshly booted machine (cold benchmark runs)."""
+        sys.exit(f"The {self.name} provider cannot reset its target; use bench --warm-only.")
+
+    def connect(self, target):
+        """Open the target's ControlMaster, write the roster and decrypt secrets.
+
+        Returns the ControlMaster socket path.
+        """
+        sock = start_control_master(self.env, target.host, target.port)
+        write_roster(self.minion_id, target.host, target.port, self.env, sock)
+        decrypt_secrets(self.env, [self.minion_id])
+        return sock
+
+    def highstate(self, target):
+        """Return (salt-ssh args, label, applied SLS modules) for a full run.
+
+        Returns None when there is nothing to apply.
+        """
+        return ["state.highstate"], "Running highstate", sls_modules()
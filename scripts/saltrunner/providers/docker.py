@@ -0,0 +1,382 @@
+"""Docker provider: a systemd container built from the repo's Dockerfile."""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from ..common import SALT_DIR, SECRETS_DIR, run
+from ..incremental import secure_linux_states, sls_modules
+from ..saltssh import run_with_spinner, salt_ssh_cmd
+from ..ssh import ready_key, wait_for_sshd
+from ..transfer import bundle_files
+from ..webbench import WEB_MATRIX, run_web_benchmark
+from .base import Provider as BaseProvider
+from .base import Target
+
+CONTAINER = "server-salt"
+SNAPSHOT_IMAGE = "server-salt:snapshot"
+SNAPSHOT_LABEL = "server-salt.applied"
+SNAPSHOT_DIGEST_LABEL = "server-salt.digest"
+ALWAYS_APPLIED = ("base.preflight",)  # run even when baked into the snapshot
+POOL_PREFIX = "server-salt-pool-"
+
+USAGE = """\
+Usage: {prog} [command] [--fail-fast] [--pool] [--incremental]
+
+Commands:
+  build   Remove container, snapshot and rebuild image
+  shell   Start container, open shell
+  ssh     Start container, ssh into it as admin
+  check [state]  Start container, apply a single state (default: base.hostname)
+  test    Start container, run highstate via salt-ssh (default)
+  snapshot [states]  Apply base/apt states (or a comma list) and commit the
+                 container as server-salt:snapshot
+  restore  Recreate the container from the snapshot image
+  pool [N]       Keep N pre-booted containers ready for --pool (0 removes them)
+  profile [N]    Run highstate, print the N slowest states (default: 15) and
+                 per-SLS/per-module totals, write a collapsed-stack file
+  bench [N]      Benchmark N cold (a fresh container) and warm highstates
+                 (default: 3), record them in .salt/bench and compare
+                 with the saved baseline
+  verify-idempotent [N]
+                 Run highstate twice, fail if the second run changes
+                 anything, rank its N costliest no-op states (default: 15)
+  bench-web [matrix] [S]
+                 Apply highstate and www.nginx, then load a static corpus
+                 over HTTP and TLS at 1/16/64/256 connections for S seconds
+                 each (default: 10) and record req/s, p50/p99 latency in
+                 .salt/bench/web.jsonl; matrix repeats it per nginx
+                 pillar variant (connections, log buffering, gzip, ...)
+  logs [filters]  Query the stored run logs (`logs help` for filters)
+  ssh-bench [N]  Time N salt-ssh test.ping runs without and with the shared
+                 ControlMaster and count SSH handshakes on the target (default: 5)
+  clean   Remove container and image
+
+Options:
+  --fail-fast    Stop check/test at the first failing state
+  --pool         Run check/test on a leased pool container, replaced afterwards
+  --incremental  test: apply only the SLS modules whose files, salt:// sources
+                 or pillar values changed since the last clean run on this target
+  --cold-only    bench: only cold runs
+  --warm-only    bench: only warm runs on the current, converged target
+  --threshold=PCT
+                 bench: fail when a median is PCT% slower than the
+                 baseline (default: 20)
+  --save-baseline
+                 bench: save this run as the new baseline
+
+Each run keeps one SSH ControlMaster per target that salt-ssh and ssh reuse;
+it is closed on exit (or after SSH_CONTROL_PERSIST idle seconds, default 600).
+
+Containers started from the snapshot image skip the states already baked into
+it: test applies only the remaining secure_linux states.\
+"""
+
+
+def is_running():
+    """Check if the container is running."""
+    result = subprocess.run(
+        ["docker", "inspect", "-f", "{{.State.Running}}", CONTAINER],
+        capture_output=True,
+        text=True,
+    )
+    return result.returncode == 0 and "true" in result.stdout
+
+
+def wait_for_healthy(container, timeout=30):
+    """Block on docker events until the container's healthcheck reports healthy.
+
+    Returns False without waiting if the container has no healthcheck.
+    """
+    since = str(int(time.time()) - 1)
+    health_format = "{{if .State.Health}}{{.State.Health.Status}}{{end}}"
+    result = subprocess.run(
+        ["docker", "inspect", "-f", health_format, container],
+        capture_output=True,
+        text=True,
+    )
+    status = result.stdout.strip()
+    if result.returncode != 0 or not status:
+        return False
+    if status == "healthy":
+        return True
+    # --since replays events emitted between the inspect above and subscribing
+    events = subprocess.Popen(
+        [
+            "docker", "events",
+            "--since", since,
+            "--filter", f"container={container}",
+            "--filter", "event=health_status",
+            "--format", "{{.Status}}",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    timer = threading.Timer(timeout, events.kill)
+    timer.start()
+    try:
+        for line in events.stdout:
+            if line.strip() == "health_status: healthy":
+                return True
+    finally:
+        timer.cancel()
+        events.kill()
+        events.wait()
+    sys.exit(f"{container} not healthy after {timeout}s")
+
+
+def image_exists(image):
+    """Check if a local Docker image exists."""
+    result = subprocess.run(
+        ["docker", "image", "inspect", image],
+        capture_output=True,
+    )
+    return result.returncode == 0
+
+
+def compose_env():
+    """Environment for docker compose: select the snapshot image if one exists."""
+    if image_exists(SNAPSHOT_IMAGE):
+        return {**os.environ, "SALT_IMAGE": SNAPSHOT_IMAGE}
+    return None
+
+
+def snapshot_digest(states):
+    """Hash of what baking states depends on: their SLS trees, salt:// files and the pillar.
+
+    Secrets count by their committed *.sls.enc ciphertext; decrypted *.sls
+    plaintext under SECRETS_DIR exists only during a run and is skipped.
+    """
+    files = bundle_files(sls_modules(states))
+    pillar_dir = SALT_DIR / "pillar"
+    for path in sorted(pillar_dir.rglob("*")):
+        if not path.is_file():
+            continue
+        if path.is_relative_to(SECRETS_DIR) and not path.name.endswith(".sls.enc"):
+            continue
+        files[str(path.relative_to(SALT_DIR))] = path
+    digest = hashlib.sha256()
+    for name, path in sorted(files.items()):
+        digest.update(f"{name}\0".encode())
+        digest.update(path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+def remaining_states(container):
+    """Return the secure_linux states not baked into the container's image.
+
+    ALWAYS_APPLIED states are kept regardless.  Returns None for containers
+    not started from a snapshot image, and (with a warning) when the baked
+    SLS files, salt:// files or pillar have changed since the snapshot.
+    """
+    result = subprocess.run(
+        ["docker", "inspect", "-f", "{{json .Config.Labels}}", container],
+        capture_output=True,
+        text=True,
+    )
+    try:
+        labels = json.loads(result.stdout) if result.returncode == 0 else None
+    except ValueError:
+        labels = None
+    labels = labels or {}
+    applied = labels.get(SNAPSHOT_LABEL)
+    if not applied:
+        return None
+    applied = applied.split(",")
+    if labels.get(SNAPSHOT_DIGEST_LABEL) != snapshot_digest(applied):
+        print(
+            f"Warning: states, files or pillar changed since {SNAPSHOT_IMAGE} was taken;"
+            " running the full highstate (re-run `snapshot` to refresh it)."
+        )
+        return None
+    return [
+        state for state in secure_linux_states()
+        if state not in applied or state in ALWAYS_APPLIED
+    ]
+
+
+def pool_port(env, slot):
+    """Host SSH port of pool container slot (DOCKER_SSH_PORT + slot)."""
+    return int(env["DOCKER_SSH_PORT"]) + slot
+
+
+def pool_slots():
+    """Return {slot: container name} for idle (not leased) pool containers."""
+    result = subprocess.run(
+        ["docker", "ps", "-a", "--filter", f"name=^{POOL_PREFIX}", "--format", "{{.Names}}"],
+        capture_output=True,
+        text=True,
+    )
+    slots = {}
+    for name in result.stdout.split():
+        if m := re.fullmatch(rf"{POOL_PREFIX}(\d+)", name):
+            slots[int(m.group(1))] = name
+    return slots
+
+
+def start_pool_container(env, slot):
+    """Boot pool container slot in the background from the snapshot (or base) image."""
+    run(
+        [
+            "docker", "compose", "run", "-d", "--no-deps",
+            "--name", f"{POOL_PREFIX}{slot}",
+            "-p", f"{pool_port(env, slot)}:22",
+            "salt",
+        ],
+        env=compose_env(),
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def lease_pool_container():
+    """Atomically claim an idle pool container by renaming it; return (name, slot)."""
+    for slot, name in sorted(pool_slots().items()):
+        leased = f"{name}-leased"
+        result = subprocess.run(["docker", "rename", name, leased], capture_output=True)
+        if result.returncode == 0:
+            return leased, slot
+    sys.exit("No idle pool containers. Run: test-docker.py pool N")
+
+
+def wait_for_container(env, container, port):
+    """Wait for a container's sshd: health event first, then a banner/auth probe."""
+    wait_for_healthy(container)
+    wait_for_sshd("localhost", port, timeout=30, key=ready_key(env))
+
+
+def ensure_running(env):
+    """Start the container if not already running (from the snapshot if present)."""
+    if not is_running():
+        snapshot = compose_env()
+        build = "--no-build" if snapshot else "--build"
+        run(["docker", "compose", "up", "-d", build], env=snapshot)
+        wait_for_container(env, CONTAINER, int(env["DOCKER_SSH_PORT"]))
+
+
+class Provider(BaseProvider):
+    name = "docker"
+    minion_id = "test_docker_1"
+    env_file = ".docker.env"
+    required = ["DOCKER_SSH_PORT", "ADMIN_SSH_KEY"]
+    usage = USAGE
+    commands = {
+        "build": "cmd_build",
+        "shell": "cmd_shell",
+        "snapshot": "cmd_snapshot",
+        "restore": "cmd_restore",
+        "pool": "cmd_pool",
+        "bench-web": "cmd_bench_web",
+        "clean": "cmd_clean",
+    }
+
+    @property
+    def port(self):
+        return int(self.env["DOCKER_SSH_PORT"])
+
+    @contextmanager
+    def target(self, pool=False):
+        """Yield the compose container, or with pool a leased pool container.
+
+        A leased container is removed afterwards and replaced by a fresh one
+        that boots in the background.
+        """
+        if not pool:
+            ensure_running(self.env)
+            yield Target("localhost", self.port, CONTAINER)
+            return
+        leased, slot = lease_pool_container()
+        try:
+            wait_for_container(self.env, leased, pool_port(self.env, slot))
+            yield Target("localhost", pool_port(self.env, slot), leased)
+        finally:
+            subprocess.run(["docker", "rm", "-f", leased], capture_output=True)
+            start_pool_container(self.env, slot)
+
+    def reset_target(self):
+        """Recreate the compose container from the base image, never the snapshot."""
+        run(["docker", "compose", "down"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        run(["docker", "compose", "up", "-d", "--build"])
+        wait_for_container(self.env, CONTAINER, self.port)
+
+    def highstate(self, target):
+        """Full highstate, or only the states not baked into a snapshot container."""
+        remaining = remaining_states(target.name)
+        if remaining is None:
+            return super().highstate(target)
+        if not remaining:
+            print("All secure_linux states are baked into the snapshot; nothing to apply.")
+            return None
+        skipped = len(secure_linux_states()) - len(remaining)
+        label = f"Running highstate (snapshot, {skipped} states skipped)"
+        return ["state.apply", ",".join(remaining)], label, remaining
+
+    def cmd_build(self):
+        run(["docker", "compose", "down"])
+        subprocess.run(["docker", "image", "rm", SNAPSHOT_IMAGE], capture_output=True)
+        run(["docker", "compose", "build"])
+
+    def cmd_shell(self):
+        ensure_running(self.env)
+        run(["docker", "exec", "-it", CONTAINER, "bash"])
+
+    def cmd_snapshot(self, states=None):
+        """Converge the snapshot states, then commit the container as SNAPSHOT_IMAGE."""
+        if states:
+            states = states.split(",")
+        else:
+            states = [s for s in secure_linux_states() if s.startswith(("base.", "apt"))]
+        with self.target() as target:
+            self.connect(target)
+            run_with_spinner(
+                salt_ssh_cmd(self.minion_id, "state.apply", ",".join(states)),
+                self.minion_id,
+                label=f"Converging {len(states)} snapshot states",
+            )
+        run(
+            [
+                "docker", "commit",
+                "--change", f"LABEL {SNAPSHOT_LABEL}={','.join(states)}",
+                "--change", f"LABEL {SNAPSHOT_DIGEST_LABEL}={snapshot_digest(states)}",
+                CONTAINER, SNAPSHOT_IMAGE,
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+        print(f"Snapshot {SNAPSHOT_IMAGE} saved ({', '.join(states)}).")
+
+    def cmd_restore(self):
+        if not image_exists(SNAPSHOT_IMAGE):
+            sys.exit("No snapshot image. Run: test-docker.py snapshot")
+        run(["docker", "compose", "down"])
+        ensure_running(self.env)
+
+    def cmd_pool(self, size="2"):
+        size = int(size)
+        slots = pool_slots()
+        for slot, name in slots.items():
+            if slot > size:
+                run(["docker", "rm", "-f", name], stdout=subprocess.DEVNULL)
+        for slot in range(1, size + 1):
+            if slot not in slots:
+                start_pool_container(self.env, slot)
+        source = SNAPSHOT_IMAGE if image_exists(SNAPSHOT_IMAGE) else "base image"
+        first, last = pool_port(self.env, 1), pool_port(self.env, size)
+        print(f"Pool: {size} container(s) from {source}, ports {first}-{last}")
+
+    def cmd_bench_web(self, *args):
+        variants = list(WEB_MATRIX) if "matrix" in args else ["default"]
+        seconds = next((float(a) for a in args if a != "matrix"), 10)
+        with self.target() as target:
+            self.connect(target)
+            run_web_benchmark(self, target, variants, seconds)
+
+    def cmd_clean(self):
+        for name in pool_slots().values():
+            run(["docker", "rm", "-f", name], stdout=subprocess.DEVNULL)
+        run(["docker", "compose", "down", "--rmi", "all", "--volumes"])
+        subprocess.run(["docker", "image", "rm", SNAPSHOT_IMAGE], capture_output=True)
@@ -0,0 +1,272 @@
+"""Hetzner Cloud provider: a Debian VM managed through the Hetzner Cloud API.
+
+Requests go over one pooled keep-alive connection per process, so a
+command costs a single TLS handshake however many calls it makes.
+HCLOUD_ENDPOINT points the client at another API (e.g. a local mock).
+"""
+
+import hashlib
+import http.client
+import json
+import random
+import sys
+import time
+import urllib.parse
+from contextlib import contextmanager
+from functools import lru_cache
+
+from ..common import CACHE_DIR, REPO_DIR, read_cache, write_cache
+from ..ssh import probe_ssh_banner, ready_key, wait_for_sshd
+from .base import Provider as BaseProvider
+from .base import Target
+
+VM_NAME = "server-salt-test"
+VM_CACHE = CACHE_DIR / "hetzner-vm.json"
+API_ENDPOINT = "https://api.hetzner.cloud/v1"
+RETRIES = 5  # retries of a rate-limited (429) or failed (5xx) request
+RETRY_DELAY = 0.5  # first backoff in seconds, doubled per retry
+RETRY_MAX_DELAY = 8.0
+
+USAGE = """\
+Usage: {prog} [command] [--fail-fast] [--incremental]
+
+Commands:
+  create  Create Hetzner VM, wait for SSH
+  check [state]  Apply a single state (default: base.hostname, creates VM if needed)
+  test    Run highstate via salt-ssh against VM (creates if needed, default)
+  profile [N]    Run highstate, print the N slowest states (default: 15) and
+                 per-SLS/per-module totals, write a collapsed-stack file
+  bench [N]      Benchmark N cold (a new VM) and warm highstates
+                 (default: 3), record them in .salt/bench and compare
+                 with the saved baseline
+  verify-idempotent [N]
+                 Run highstate twice, fail if the second run changes
+                 anything, rank its N costliest no-op states (default: 15)
+  logs [filters]  Query the stored run logs (`logs help` for filters)
+  ssh     SSH into VM as admin
+  ssh-bench [N]  Time N salt-ssh test.ping runs without and with the shared
+                 ControlMaster and count SSH handshakes on the VM (default: 5)
+  delete  Delete VM
+  ip      Print VM's current IP
+
+Options:
+  --fail-fast    Stop check/test at the first failing state
+  --incremental  test: apply only the SLS modules whose files, salt:// sources
+                 or pillar values changed since the last clean run on this VM
+  --cold-only    bench: only cold runs
+  --warm-only    bench: only warm runs on the current, converged target
+  --threshold=PCT
+                 bench: fail when a median is PCT% slower than the
+                 baseline (default: 20)
+  --save-baseline
+                 bench: save this run as the new baseline
+
+Each run keeps one SSH ControlMaster to the VM that salt-ssh and ssh reuse;
+it is closed on exit (or after SSH_CONTROL_PERSIST idle seconds, default 600).\
+"""
+
+
+class HcloudClient:
+    """Hetzner Cloud API client on one keep-alive HTTP(S) connection."""
+
+    def __init__(self, token, endpoint):
+        url = urllib.parse.urlsplit(endpoint)
+        self.scheme, self.netloc, self.prefix = url.scheme, url.netloc, url.path.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        self.conn = None
+
+    def connection(self):
+        """Return the open connection, opening it on first use."""
+        if self.conn is None:
+            if self.scheme == "https":
+                self.conn = http.client.HTTPSConnection(self.netloc, timeout=30)
+            else:
+                self.conn = http.client.HTTPConnection(self.netloc, timeout=30)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def send(self, method, path, payload):
+        """Send one request; return (HTTP status, response body, Retry-After seconds or None).
+
+        A request on a reused connection that the server has meanwhile closed
+        is retried once on a fresh connection.
+        """
+        for attempt in range(2):
+            reused = self.conn is not None
+            conn = self.connection()
+            try:
+                conn.request(method, self.prefix + path, body=payload, headers=self.headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                self.close()
+                if not reused or attempt:
+                    sys.exit(f"hcloud API error: {method} {path}: {e}")
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                sys.exit(f"hcloud API error: {method} {path}: {e!r}")
+        retry_after = response.getheader("Retry-After", "")
+        return response.status, data, int(retry_after) if retry_after.isdigit() else None
+
+    def request(self, method, path, body=None):
+        """Send one API request and return the decoded JSON, exit on an API error.
+
+        Rate limiting (429) and server errors (5xx) are retried up to RETRIES
+        times, waiting Retry-After or an exponential, jittered backoff.  A
+        POST is only retried on 429 and 503, which mean it was not acted on,
+        so a server is never created twice.
+        """
+        payload = json.dumps(body) if body is not None else None
+        delay = RETRY_DELAY
+        for attempt in range(RETRIES + 1):
+            status, data, retry_after = self.send(method, path, payload)
+            retryable = status in (429, 503) or (status >= 500 and method != "POST")
+            if not retryable or attempt == RETRIES:
+                break
+            time.sleep(min(retry_after or delay * random.uniform(0.5, 1.5), RETRY_MAX_DELAY))
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+        try:
+            result = json.loads(data) if data else {}
+        except ValueError:
+            result = None
+        if status >= 400:
+            error = (result.get("error") or {}) if isinstance(result, dict) else {}
+            code = f" {error['code']}" if error.get("code") else ""
+            message = error.get("message") or data.decode(errors="replace").strip()[:200]
+            sys.exit(f"hcloud API error: {method} {path}: HTTP {status}{code}: {message}")
+        if not isinstance(result, dict):
+            sys.exit(f"hcloud API error: {method} {path}: HTTP {status} with a non-JSON body")
+        return result
+
+    def server(self, name):
+        """Return the server record named name, or None."""
+        servers = self.request("GET", f"/servers?name={urllib.parse.quote(name)}")["servers"]
+        return servers[0] if servers else None
+
+    def wait_for_action(self, action, timeout=300):
+        """Poll an action until it leaves the running state, exit if it fails."""
+        deadline = time.monotonic() + timeout
+        while action["status"] == "running":
+            if time.monotonic() > deadline:
+                sys.exit(f"Timed out waiting for hcloud action {action['command']} ({action['id']})")
+            time.sleep(1)
+            action = self.request("GET", f"/actions/{action['id']}")["action"]
+        if action["status"] == "error":
+            error = action.get("error") or {}
+            sys.exit(f"hcloud action {action['command']} failed: {error.get('message', 'unknown error')}")
+        return action
+
+
+@lru_cache(maxsize=None)
+def hcloud_client(token, endpoint):
+    """Return the process-wide client for token and endpoint."""
+    return HcloudClient(token, endpoint)
+
+
+def api(env):
+    """The client for the project whose token is in env."""
+    return hcloud_client(env["HCLOUD_TOKEN"], env.get("HCLOUD_ENDPOINT", API_ENDPOINT))
+
+
+def vm_cache_key(env):
+    """Cache key for the test VM: endpoint, a token digest and the VM name."""
+    token = hashlib.sha256(env["HCLOUD_TOKEN"].encode()).hexdigest()[:12]
+    return f"{env.get('HCLOUD_ENDPOINT', API_ENDPOINT)}/{token}/{VM_NAME}"
+
+
+def lookup_vm(env):
+    """Look up the test VM through the API and refresh the cache; None if absent."""
+    server = api(env).server(VM_NAME)
+    entry = server and {"id": server["id"], "ip": server["public_net"]["ipv4"]["ip"]}
+    write_cache(VM_CACHE, vm_cache_key(env), entry)
+    return entry
+
+
+def find_vm(env):
+    """Return the test VM's {"id", "ip"}, from the cache when it still answers SSH.
+
+    A cached entry is trusted for HETZNER_CACHE_TTL seconds (default 3600)
+    and only while its sshd sends a banner; otherwise one name-filtered
+    API request refreshes it.
+    """
+    entry = read_cache(VM_CACHE, vm_cache_key(env), int(env.get("HETZNER_CACHE_TTL", "3600")))
+    if entry and probe_ssh_banner(entry["ip"], 22):
+        return entry
+    return lookup_vm(env)
+
+
+class Provider(BaseProvider):
+    name = "hetzner"
+    minion_id = "test_hetzner_1"
+    env_file = ".hetzner.env"
+    env_hint = "Copy .hetzner.env.example and fill in your values."
+    required = ["HCLOUD_TOKEN", "HETZNER_SERVER_TYPE", "HETZNER_LOCATION", "ADMIN_SSH_KEY"]
+    usage = USAGE
+    commands = {"create": "cmd_create", "delete": "cmd_delete", "ip": "cmd_ip"}
+
+    @contextmanager
+    def target(self, pool=False):
+        """Yield the VM, creating it first if it does not exist."""
+        vm = find_vm(self.env)
+        if not vm:
+            vm = self.cmd_create()
+        yield Target(vm["ip"], 22, VM_NAME)
+
+    def existing_target(self):
+        vm = find_vm(self.env)
+        if not vm:
+            sys.exit(f"No VM '{VM_NAME}' found. Run: test-hetzner.py create")
+        return Target(vm["ip"], 22, VM_NAME)
+
+    def reset_target(self):
+        """Delete the VM and create a new one."""
+        self.cmd_delete()
+        self.cmd_create()
+
+    def cmd_create(self):
+        env = self.env
+        vm = lookup_vm(env)
+        if vm:
+            print(f"VM '{VM_NAME}' already exists. IP: {vm['ip']}")
+            return vm
+        print(f"Creating VM '{VM_NAME}'...")
+        client = api(env)
+        created = client.request("POST", "/servers", {
+            "name": VM_NAME,
+            "image": "debian-12",
+            "server_type": env["HETZNER_SERVER_TYPE"],
+            "location": env["HETZNER_LOCATION"],
+            "user_data": (REPO_DIR / "scripts" / "vm-userdata.yaml").read_text(),
+        })
+        server = created["server"]
+        vm = {"id": server["id"], "ip": server["public_net"]["ipv4"]["ip"]}
+        write_cache(VM_CACHE, vm_cache_key(env), vm)
+        client.wait_for_action(created["action"])
+        print(f"VM created. IP: {vm['ip']}")
+        wait_for_sshd(vm["ip"], key=ready_key(env))
+        return vm
+
+    def cmd_delete(self):
+        vm = lookup_vm(self.env)
+        if not vm:
+            print(f"No VM named '{VM_NAME}' found.")
+            return
+        client = api(self.env)
+        client.wait_for_action(client.request("DELETE", f"/servers/{vm['id']}")["action"])
+        write_cache(VM_CACHE, vm_cache_key(self.env), None)
+        print(f"VM '{VM_NAME}' deleted.")
+
+    def cmd_ip(self):
+        vm = find_vm(self.env)
+        if not vm:
+            sys.exit(f"No VM '{VM_NAME}' exists.")
+        print(vm["ip"])
@@ -0,0 +1,65 @@
+"""Local stand-in provider: an existing SSH host the runner does not manage.
+
+Useful for a VM started by hand (libvirt, multipass, a spare box) or a
+container from another compose project.  The minion ID defaults to
+test_docker_1 so the Docker test pillar applies.
+"""
+
+from contextlib import contextmanager
+
+from ..ssh import ready_key, wait_for_sshd
+from .base import Provider as BaseProvider
+from .base import Target
+
+USAGE = """\
+Usage: {prog} [command] [--fail-fast] [--incremental]
+
+Commands:
+  check [state]  Apply a single state (default: base.hostname)
+  test    Run highstate via salt-ssh against LOCAL_HOST
+  profile [N]    Run highstate, print the N slowest states (default: 15) and
+                 per-SLS/per-module totals, write a collapsed-stack file
+  bench [N]      Benchmark N warm highstates (default: 3, needs
+                 --warm-only), record them in .salt/bench and compare
+                 with the saved baseline
+  verify-idempotent [N]
+                 Run highstate twice, fail if the second run changes
+                 anything, rank its N costliest no-op states (default: 15)
+  logs [filters]  Query the stored run logs (`logs help` for filters)
+  ssh     SSH into the host as admin
+  ssh-bench [N]  Time N salt-ssh test.ping runs without and with the shared
+                 ControlMaster and count SSH handshakes on the host (default: 5)
+
+Options:
+  --fail-fast    Stop check/test at the first failing state
+  --incremental  test: apply only the SLS modules whose files, salt:// sources
+                 or pillar values changed since the last clean run on this host
+  --warm-only    bench: only warm runs on the current, converged target
+  --threshold=PCT
+                 bench: fail when a median is PCT% slower than the
+                 baseline (default: 20)
+  --save-baseline
+                 bench: save this run as the new baseline
+
+Configured in .local.env: LOCAL_HOST, LOCAL_SSH_PORT (default 22),
+LOCAL_MINION_ID (default test_docker_1) and ADMIN_SSH_KEY.\
+"""
+
+
+class Provider(BaseProvider):
+    name = "local"
+    env_file = ".local.env"
+    required = ["LOCAL_HOST", "ADMIN_SSH_KEY"]
+    usage = USAGE
+
+    def __init__(self, env):
+        super().__init__(env)
+        if env:
+            self.minion_id = env.get("LOCAL_MINION_ID", "test_docker_1")
+
+    @contextmanager
+    def target(self, pool=False):
+        """Yield the configured host once its sshd is ready."""
+        host, port = self.env["LOCAL_HOST"], int(self.env.get("LOCAL_SSH_PORT", "22"))
+        wait_for_sshd(host, port, timeout=30, key=ready_key(self.env))
+        yield Target(host, port, host)
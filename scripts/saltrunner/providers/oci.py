@@ -0,0 +1,562 @@
+"""Oracle Cloud provider: a VM managed through the OCI Python SDK.
+
+The SDK is imported inside the functions that use it, so selecting another
+provider or printing help never pays for loading it.
+"""
+
+import base64
+import hashlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+from ..common import CACHE_DIR, REPO_DIR, read_cache, write_cache
+from ..ssh import probe_ssh_banner, ready_key, wait_for_sshd
+from .base import Provider as BaseProvider
+from .base import Target
+
+VM_NAME = "server-salt-test"
+VM_CACHE = CACHE_DIR / "oci-vm.json"
+SHAPE_CACHE = CACHE_DIR / "oci-shapes.json"
+SHAPE_CACHE_TTL = 86400
+UPLOAD_STATE = CACHE_DIR / "oci-upload.json"
+
+USAGE = """\
+Usage: {prog} [command] [--fail-fast] [--incremental]
+
+Commands:
+  auth          Test OCI authentication (config + key fingerprint)
+  upload-image  Upload qcow2 to Object Storage and import as custom image
+  create        Create Oracle Cloud VM, wait for SSH
+  check [state] Apply a single state (default: base.hostname, creates VM if needed)
+  test          Run highstate via salt-ssh against VM (creates if needed, default)
+  profile [N]   Run highstate, print the N slowest states (default: 15) and
+                per-SLS/per-module totals, write a collapsed-stack file
+  bench [N]     Benchmark N cold (a new VM) and warm highstates
+                (default: 3), record them in .salt/bench and compare
+                with the saved baseline
+  verify-idempotent [N]
+                Run highstate twice, fail if the second run changes
+                anything, rank its N costliest no-op states (default: 15)
+  logs [filters] Query the stored run logs (`logs help` for filters)
+  ssh           SSH into VM as admin
+  ssh-bench [N] Time N salt-ssh test.ping runs without and with the shared
+                ControlMaster and count SSH handshakes on the VM (default: 5)
+  delete        Delete VM
+  ip            Print VM's current IP
+
+Options:
+  --fail-fast    Stop check/test at the first failing state
+  --incremental  test: apply only the SLS modules whose files, salt:// sources
+                 or pillar values changed since the last clean run on this VM
+  --cold-only    bench: only cold runs
+  --warm-only    bench: only warm runs on the current, converged target
+  --threshold=PCT
+                 bench: fail when a median is PCT% slower than the
+                 baseline (default: 20)
+  --save-baseline
+                 bench: save this run as the new baseline
+
+Each run keeps one SSH ControlMaster to the VM that salt-ssh and ssh reuse;
+it is closed on exit (or after SSH_CONTROL_PERSIST idle seconds, default 600).\
+"""
+
+
+# Stand-in credentials for OCI_ENDPOINT (e.g. mockcloud.py), which needs no signing
+MOCK_CONFIG = {
+    "user": "ocid1.user.oc1..mock",
+    "tenancy": "ocid1.tenancy.oc1..mock",
+    "fingerprint": ":".join(["00"] * 16),
+    "key_file": "/dev/null",
+    "region": "us-ashburn-1",
+}
+
+
+class UnsignedRequests:
+    """Request signer that leaves requests unsigned, for OCI_ENDPOINT."""
+
+    def __call__(self, request):
+        return request
+
+
+@lru_cache(maxsize=None)
+def oci_config(endpoint=None):
+    """Load ~/.oci/config once per process; stand-in values for an OCI_ENDPOINT."""
+    import oci
+
+    if endpoint:
+        return MOCK_CONFIG
+    return oci.config.from_file()
+
+
+def make_client(service, endpoint=None):
+    """Create a client for service: compute, network, object_storage or identity.
+
+    With an endpoint every request goes there unsigned instead of to the
+    region's OCI API.
+    """
+    import oci
+
+    factories = {
+        "compute": oci.core.ComputeClient,
+        "network": oci.core.VirtualNetworkClient,
+        "object_storage": oci.object_storage.ObjectStorageClient,
+        "identity": oci.identity.IdentityClient,
+    }
+    if endpoint:
+        return factories[service](oci_config(endpoint), signer=UnsignedRequests(), service_endpoint=endpoint)
+    return factories[service](oci_config())
+
+
+@lru_cache(maxsize=None)
+def shared_client(service, endpoint):
+    """One client per service and endpoint for the whole process."""
+    return make_client(service, endpoint)
+
+
+def oci_client(env, service):
+    """Return the memoized client for service, honouring OCI_ENDPOINT."""
+    return shared_client(service, env.get("OCI_ENDPOINT"))
+
+
+def get_instance(env):
+    """Return the test VM instance if it exists, else None.
+
+    Filtered by display name server-side, so this is one small API call.
+    """
+    import oci
+
+    instances = oci.pagination.list_call_get_all_results(
+        oci_client(env, "compute").list_instances,
+        env["OCI_COMPARTMENT_OCID"],
+        display_name=VM_NAME,
+    ).data
+    for instance in instances:
+        if instance.lifecycle_state not in ("TERMINATED", "TERMINATING"):
+            return instance
+    return None
+
+
+def instance_ip(env, instance_id):
+    """Return the public IPv4 of an instance's VNIC, or None if it has none yet."""
+    import oci
+
+    attachments = oci.pagination.list_call_get_all_results(
+        oci_client(env, "compute").list_vnic_attachments,
+        env["OCI_COMPARTMENT_OCID"],
+        instance_id=instance_id,
+    ).data
+    for attachment in attachments:
+        vnic = oci_client(env, "network").get_vnic(attachment.vnic_id).data
+        if vnic.public_ip:
+            return vnic.public_ip
+    return None
+
+
+def read_vm_cache(env):
+    """Return the cached {"id", "ip"} of the test VM if younger than OCI_CACHE_TTL."""
+    key = f"{env['OCI_COMPARTMENT_OCID']}/{VM_NAME}"
+    return read_cache(VM_CACHE, key, int(env.get("OCI_CACHE_TTL", "3600")))
+
+
+def write_vm_cache(env, entry):
+    """Store the test VM's {"id", "ip"} in the cache, or drop it when entry is None."""
+    write_cache(VM_CACHE, f"{env['OCI_COMPARTMENT_OCID']}/{VM_NAME}", entry)
+
+
+def lookup_vm(env):
+    """Look up the test VM through the API and refresh the cache; None if absent."""
+    instance = get_instance(env)
+    if not instance:
+        write_vm_cache(env, None)
+        return None
+    ip = instance_ip(env, instance.id)
+    if not ip:
+        sys.exit("No public IP found for VM.")
+    entry = {"id": instance.id, "ip": ip}
+    write_vm_cache(env, entry)
+    return entry
+
+
+def shape_cache_key(env):
+    """Cache key for the AD lookup: region, compartment and shape."""
+    return f"{oci_config(env.get('OCI_ENDPOINT'))['region']}/{env['OCI_COMPARTMENT_OCID']}/{env['OCI_SHAPE']}"
+
+
+def shape_availability_domain(env):
+    """Return the first availability domain that offers OCI_SHAPE.
+
+    All ADs are queried concurrently, one client per thread, and the answer
+    is cached per region, compartment and shape for a day.
+    """
+    import oci
+
+    key = shape_cache_key(env)
+    if entry := read_cache(SHAPE_CACHE, key, SHAPE_CACHE_TTL):
+        return entry["ad"]
+    compartment = env["OCI_COMPARTMENT_OCID"]
+    domains = [ad.name for ad in oci_client(env, "identity").list_availability_domains(compartment).data]
+
+    def offers_shape(ad):
+        compute = make_client("compute", env.get("OCI_ENDPOINT"))
+        shapes = oci.pagination.list_call_get_all_results(
+            compute.list_shapes, compartment, availability_domain=ad,
+        ).data
+        return any(s.shape == env["OCI_SHAPE"] for s in shapes)
+
+    with ThreadPoolExecutor(max_workers=max(len(domains), 1)) as pool:
+        offered = list(pool.map(offers_shape, domains))
+    ad = next((domain for domain, ok in zip(domains, offered) if ok), None)
+    if not ad:
+        sys.exit(f"Shape '{env['OCI_SHAPE']}' not available in any AD in this region.")
+    write_cache(SHAPE_CACHE, key, {"ad": ad})
+    return ad
+
+
+def wait_for_public_ip(env, instance_id, timeout=300):
+    """Poll a launching instance until its VNIC has a public IP; return the IP.
+
+    The public IP is usually assigned while the instance is still
+    PROVISIONING, so returning here, rather than after RUNNING, lets SSH
+    probing start as early as possible.  The lifecycle state is checked on
+    the same poll to fail fast if the launch dies.
+    """
+    compute = oci_client(env, "compute")
+    deadline = time.monotonic() + timeout
+    delay = 1.0
+    state = None
+    while time.monotonic() < deadline:
+        ip = instance_ip(env, instance_id)
+        if ip:
+            return ip
+        current = compute.get_instance(instance_id).data.lifecycle_state
+        if current in ("TERMINATING", "TERMINATED"):
+            sys.exit(f"\nInstance {current.lower()} during launch.")
+        print(f" {current.lower()}" if current != state else ".", end="", flush=True)
+        state = current
+        time.sleep(delay)
+        delay = min(delay * 1.5, 5.0)
+    sys.exit(f"\nNo public IP assigned after {timeout}s")
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in 8 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(8 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_progress(total, done=0):
+    """Return a thread-safe progress callback printing percent, MiB and MiB/s.
+
+    done is the byte count already uploaded; it counts towards the percentage
+    but not the rate.
+    """
+    lock = threading.Lock()
+    start = time.monotonic()
+    sent = [0]
+
+    def progress(nbytes):
+        with lock:
+            sent[0] += nbytes
+            uploaded = done + sent[0]
+            rate = sent[0] / max(time.monotonic() - start, 1e-6) / (1 << 20)
+            print(
+                f"\r  Uploading... {uploaded * 100 // total}%"
+                f" ({uploaded >> 20} / {total >> 20} MiB, {rate:.1f} MiB/s)",
+                end="",
+                flush=True,
+            )
+
+    return progress
+
+
+def upload_object(env, namespace, path, object_name):
+    """Upload path as a multipart object, resuming an interrupted upload of it.
+
+    Parts are OCI_UPLOAD_PART_MIB (default 128) MiB, OCI_UPLOAD_PARALLEL
+    (default 8) at a time.  The object carries the file's SHA-256 as
+    metadata, and an object whose checksum already matches is not uploaded
+    again.  The multipart upload ID is saved in .salt/cache/oci-upload.json
+    until the commit succeeds, so a re-run uploads only the parts Object
+    Storage does not have yet.
+    """
+    import oci
+
+    object_storage = oci_client(env, "object_storage")
+    bucket = env["OCI_BUCKET_NAME"]
+    stat = path.stat()
+    print(f"Checksumming {path.name}...", end="", flush=True)
+    digest = file_sha256(path)
+    print(f" sha256 {digest[:16]}…")
+    try:
+        head = object_storage.head_object(namespace, bucket, object_name)
+        if head.headers.get("opc-meta-sha256") == digest:
+            print(f"  {object_name} is already in '{bucket}' with the same checksum, skipping upload.")
+            return
+    except oci.exceptions.ServiceError as e:
+        if e.status != 404:
+            raise
+
+    part_size = int(env.get("OCI_UPLOAD_PART_MIB", "128")) << 20
+    identity = {
+        "bucket": bucket,
+        "object": object_name,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": digest,
+        "part_size": part_size,
+    }
+    key = f"{namespace}/{bucket}/{object_name}"
+    state = read_cache(UPLOAD_STATE, key, float("inf"))
+    upload_id = None
+    if state and all(state.get(k) == v for k, v in identity.items()):
+        upload_id = state["upload_id"]
+
+    assembler = oci.object_storage.MultipartObjectAssembler(
+        object_storage, namespace, bucket, object_name,
+        part_size=part_size,
+        allow_parallel_uploads=True,
+        parallel_process_count=int(env.get("OCI_UPLOAD_PARALLEL", "8")),
+        metadata={"sha256": digest},
+    )
+    assembler.add_parts_from_file(str(path))
+    try:
+        if upload_id:
+            try:
+                parts = oci.pagination.list_call_get_all_results(
+                    object_storage.list_multipart_upload_parts,
+                    namespace, bucket, object_name, upload_id,
+                ).data
+                print(f"Resuming upload of {path.name} to bucket '{bucket}' ({len(parts)} parts already uploaded)...")
+                progress = upload_progress(stat.st_size, sum(part.size for part in parts))
+                assembler.resume(upload_id=upload_id, progress_callback=progress)
+            except oci.exceptions.ServiceError as e:
+                if e.status != 404:
+                    raise
+                print("  Previous upload expired, starting over.")
+                upload_id = None
+        if not upload_id:
+            print(f"Uploading {path.name} to bucket '{bucket}'...")
+            progress = upload_progress(stat.st_size)
+            assembler.new_upload()
+            write_cache(UPLOAD_STATE, key, {**identity, "upload_id": assembler.manifest["uploadId"]})
+            assembler.upload(progress_callback=progress)
+        assembler.commit()
+    except Exception:
+        print("\n  Upload interrupted; run upload-image again to resume.")
+        raise
+    write_cache(UPLOAD_STATE, key, None)
+    print(f"\r  Upload complete.{' ' * 60}")
+
+
+def find_vm(env):
+    """Return the test VM's {"id", "ip"}, from the cache when it still answers SSH.
+
+    A cached IP whose sshd does not send a banner (VM deleted or replaced
+    outside this script) is dropped from the cache and refreshed through
+    the API.
+    """
+    entry = read_vm_cache(env)
+    if entry and probe_ssh_banner(entry["ip"], 22):
+        return entry
+    if entry:
+        write_vm_cache(env, None)
+    return lookup_vm(env)
+
+
+class Provider(BaseProvider):
+    name = "oci"
+    minion_id = "test_oci_1"
+    env_file = ".oci.env"
+    env_hint = "Copy .oci.env.example and fill in your values."
+    required = [
+        "OCI_COMPARTMENT_OCID",
+        "OCI_IMAGE_OCID",
+        "OCI_SUBNET_OCID",
+        "OCI_BUCKET_NAME",
+        "OCI_SHAPE",
+        "ADMIN_SSH_KEY",
+    ]
+    usage = USAGE
+    commands = {
+        "auth": "cmd_auth",
+        "upload-image": "cmd_upload_image",
+        "create": "cmd_create",
+        "delete": "cmd_delete",
+        "ip": "cmd_ip",
+    }
+    env_free = ("auth",)
+
+    @contextmanager
+    def target(self, pool=False):
+        """Yield the VM, creating it first if it does not exist."""
+        vm = find_vm(self.env)
+        if not vm:
+            self.cmd_create()
+            vm = read_vm_cache(self.env)
+        yield Target(vm["ip"], 22, VM_NAME)
+
+    def existing_target(self):
+        vm = find_vm(self.env)
+        if not vm:
+            sys.exit(f"No VM '{VM_NAME}' found. Run: test-oci.py create")
+        return Target(vm["ip"], 22, VM_NAME)
+
+    def cmd_auth(self):
+        """Test OCI authentication: verify key fingerprint and make a live API call."""
+        import os
+
+        import oci
+        from cryptography.hazmat.primitives.serialization import (
+            Encoding,
+            PublicFormat,
+            load_pem_private_key,
+        )
+
+        config = oci_config()
+        key_path = os.path.expanduser(config["key_file"])
+
+        with open(key_path, "rb") as f:
+            key_data = f.read()
+        key = load_pem_private_key(key_data, password=None)
+        pub_der = key.public_key().public_bytes(
+            Encoding.DER, PublicFormat.SubjectPublicKeyInfo
+        )
+        md5 = hashlib.md5(pub_der).hexdigest()
+        computed_fp = ":".join(md5[i : i + 2] for i in range(0, 32, 2))
+
+        config_fp = config["fingerprint"]
+        fp_ok = config_fp == computed_fp
+        print(f"config fingerprint:   {config_fp}")
+        print(f"key fingerprint:      {computed_fp}")
+        print(f"fingerprint match:    {'OK' if fp_ok else 'MISMATCH'}")
+        if not fp_ok:
+            sys.exit(
+                "\nFingerprint mismatch — update ~/.oci/config or re-upload the key in the OCI Console."
+            )
+
+        # auth runs without an env file (env_free), so build the client from
+        # the config checked above rather than through oci_client(env)
+        print("Testing API call (get_namespace)...", end=" ", flush=True)
+        object_storage = oci.object_storage.ObjectStorageClient(config)
+        try:
+            ns = object_storage.get_namespace().data
+            print(f"OK (namespace: {ns})")
+        except oci.exceptions.ServiceError as e:
+            print(f"FAILED\n{e.status} {e.code}: {e.message}")
+            sys.exit(1)
+
+    def cmd_upload_image(self):
+        """Upload qcow2 to Object Storage and import it as a custom image."""
+        import oci
+
+        env = self.env
+        image_file = REPO_DIR / "debian-12-genericcloud-amd64.qcow2"
+        if not image_file.exists():
+            sys.exit(f"Image file not found: {image_file}")
+
+        compute = oci_client(env, "compute")
+        namespace = oci_client(env, "object_storage").get_namespace().data
+        bucket = env["OCI_BUCKET_NAME"]
+        image_object_name = image_file.name
+
+        upload_object(env, namespace, image_file, image_object_name)
+
+        print("Importing as custom image...")
+        image = compute.create_image(
+            oci.core.models.CreateImageDetails(
+                compartment_id=env["OCI_COMPARTMENT_OCID"],
+                display_name="debian-12-genericcloud-amd64",
+                image_source_details=oci.core.models.ImageSourceViaObjectStorageTupleDetails(
+                    source_type="objectStorageTuple",
+                    namespace_name=namespace,
+                    bucket_name=bucket,
+                    object_name=image_object_name,
+                    source_image_type="QCOW2",
+                    operating_system="Debian GNU/Linux",
+                    operating_system_version="12",
+                ),
+            )
+        ).data
+
+        print("Waiting for image to become available...", end="", flush=True)
+        oci.wait_until(
+            compute,
+            compute.get_image(image.id),
+            "lifecycle_state",
+            "AVAILABLE",
+            max_wait_seconds=1200,
+            succeed_on_not_found=False,
+        )
+        print(" done.")
+        print(f"\nImage OCID: {image.id}")
+        print(f"\nUpdate OCI_IMAGE_OCID in .oci.env to:\n  {image.id}")
+
+    def reset_target(self):
+        """Delete the VM and create a new one."""
+        self.cmd_delete()
+        self.cmd_create()
+
+    def cmd_create(self):
+        import oci
+
+        env = self.env
+        vm = lookup_vm(env)
+        if vm:
+            print(f"VM '{VM_NAME}' already exists. IP: {vm['ip']}")
+            return
+        compute = oci_client(env, "compute")
+
+        userdata = (REPO_DIR / "scripts" / "vm-userdata.yaml").read_text()
+        userdata_b64 = base64.b64encode(userdata.encode()).decode()
+
+        ad = shape_availability_domain(env)
+        print(f"Creating VM '{VM_NAME}' in {ad}...")
+        details = oci.core.models.LaunchInstanceDetails(
+            compartment_id=env["OCI_COMPARTMENT_OCID"],
+            availability_domain=ad,
+            display_name=VM_NAME,
+            shape=env["OCI_SHAPE"],
+            image_id=env["OCI_IMAGE_OCID"],
+            create_vnic_details=oci.core.models.CreateVnicDetails(
+                subnet_id=env["OCI_SUBNET_OCID"],
+                assign_public_ip=True,
+            ),
+            metadata={
+                "user_data": userdata_b64,
+            },
+        )
+        try:
+            instance = compute.launch_instance(details).data
+        except oci.exceptions.ServiceError:
+            write_cache(SHAPE_CACHE, shape_cache_key(env), None)  # rediscover next time
+            raise
+
+        print("Waiting for a public IP...", end="", flush=True)
+        ip = wait_for_public_ip(env, instance.id)
+        write_vm_cache(env, {"id": instance.id, "ip": ip})
+        print(f"\nVM created. IP: {ip}")
+        wait_for_sshd(ip, timeout=180, key=ready_key(env))
+
+    def cmd_delete(self):
+        env = self.env
+        vm = find_vm(env)
+        if not vm:
+            print(f"No VM named '{VM_NAME}' found.")
+            return
+        oci_client(env, "compute").terminate_instance(vm["id"])
+        write_vm_cache(env, None)
+        print(f"VM '{VM_NAME}' terminating.")
+
+    def cmd_ip(self):
+        env = self.env
+        vm = find_vm(env)
+        if not vm:
+            sys.exit(f"No VM '{VM_NAME}' exists.")
+        print(vm["ip"])
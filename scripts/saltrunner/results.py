@@ -0,0 +1,157 @@
+"""Parsing, summarising and profiling salt-ssh --out=json state results."""
+
+import json
+from dataclasses import dataclass
+
+
+@dataclass
+class StateResult:
+    """One state's return from a salt-ssh --out=json run."""
+
+    id: str
+    function: str
+    name: str
+    sls: str
+    result: bool | None
+    changes: dict
+    comment: str
+    duration: float  # milliseconds
+    start_time: str
+    run_num: int
+
+    @classmethod
+    def from_return(cls, key, ret):
+        """Build from a state return key (mod_|-id_|-name_|-fun) and its dict."""
+        module, state_id, name, fun = key.split("_|-")
+        comment = ret.get("comment", "")
+        if isinstance(comment, list):
+            comment = "\n".join(str(c) for c in comment)
+        return cls(
+            id=ret.get("__id__", state_id),
+            function=f"{module}.{fun}",
+            name=str(ret.get("name", name)),
+            sls=ret.get("__sls__", ""),
+            result=ret.get("result"),
+            changes=ret.get("changes") or {},
+            comment=str(comment),
+            duration=float(ret.get("duration") or 0),
+            start_time=ret.get("start_time", ""),
+            run_num=int(ret.get("__run_num__", 0)),
+        )
+
+
+def parse_salt_json(data):
+    """Parse salt-ssh JSON output into {minion: [StateResult, ...] or error string}.
+
+    States are returned in execution order.  A minion whose return is not a
+    state dict (render errors, SSH failures) maps to an error message instead.
+    """
+    results = {}
+    for minion, ret in data.items():
+        if isinstance(ret, dict) and ret and all("_|-" in k for k in ret):
+            states = [StateResult.from_return(k, v) for k, v in ret.items()]
+            results[minion] = sorted(states, key=lambda s: s.run_num)
+        elif isinstance(ret, list):
+            results[minion] = "\n".join(str(line) for line in ret)
+        elif isinstance(ret, dict) and ("stderr" in ret or "stdout" in ret):
+            results[minion] = (ret.get("stderr") or ret.get("stdout") or "").strip()
+        else:
+            results[minion] = json.dumps(ret, indent=2, default=str)
+    return results
+
+
+def summarize(states):
+    """Return a summary dict and the list of failed state IDs."""
+    failed_ids = [s.id for s in states if s.result is False]
+    summary = {
+        "succeeded": len(states) - len(failed_ids),
+        "changed": sum(1 for s in states if s.changes),
+        "failed": len(failed_ids),
+    }
+    return summary, failed_ids
+
+
+def render_log(results):
+    """Render parsed results as a human-readable log."""
+    out = []
+    for minion, states in results.items():
+        out.append(f"{minion}:")
+        if isinstance(states, str):
+            out.append(f"  ERROR: {states}")
+            continue
+        for s in states:
+            changes = json.dumps(s.changes, indent=2, default=str) if s.changes else ""
+            out += [
+                "----------",
+                f"          ID: {s.id}",
+                f"    Function: {s.function}",
+                f"        Name: {s.name}",
+                f"         SLS: {s.sls}",
+                f"      Result: {s.result}",
+                f"     Comment: {s.comment}".replace("\n", "\n" + " " * 14),
+                f"     Started: {s.start_time}",
+                f"    Duration: {s.duration:.1f} ms",
+                f"     Changes: {changes}".rstrip().replace("\n", "\n" + " " * 14),
+            ]
+        summary, _ = summarize(states)
+        out += [
+            "",
+            f"Summary for {minion}",
+            "-" * 14,
+            f"Succeeded: {summary['succeeded']} (changed={summary['changed']})",
+            f"Failed:    {summary['failed']}",
+            f"Total run time: {sum(s.duration for s in states) / 1000:.3f} s",
+            "",
+        ]
+    return "\n".join(out) + "\n"
+
+
+def profile_report(states, top=15):
+    """Print the slowest states and duration totals per SLS file and per state module."""
+    total = sum(s.duration for s in states) or 1.0
+    print(f"\nSlowest states (top {top} of {len(states)}, total {total / 1000:.1f}s):")
+    print(f"  {'ms':>9}  {'%':>5}  {'run':>4}  {'function':<20} {'sls':<28} id")
+    for s in sorted(states, key=lambda s: s.duration, reverse=True)[:top]:
+        print(
+            f"  {s.duration:>9.1f}  {s.duration * 100 / total:>5.1f}  {s.run_num:>4}"
+            f"  {s.function:<20} {s.sls:<28} {s.id}"
+        )
+
+    for title, key in (
+        ("SLS file", lambda s: s.sls),
+        ("state module", lambda s: s.function.split(".")[0]),
+    ):
+        groups = {}
+        for s in states:
+            count, ms = groups.get(key(s), (0, 0.0))
+            groups[key(s)] = (count + 1, ms + s.duration)
+        print(f"\nBy {title}:")
+        print(f"  {'ms':>9}  {'%':>5}  {'states':>6}  {title}")
+        for name, (count, ms) in sorted(groups.items(), key=lambda g: g[1][1], reverse=True):
+            print(f"  {ms:>9.1f}  {ms * 100 / total:>5.1f}  {count:>6}  {name}")
+
+
+def idempotency_report(states, top=15):
+    """Print a re-run's costliest no-op states and any that changed; return the changed ones."""
+    changed = [s for s in states if s.changes]
+    noop = [s for s in states if not s.changes]
+    total = sum(s.duration for s in noop) or 1.0
+    print(f"\nNo-op cost (top {top} of {len(noop)} unchanged states, total {total / 1000:.1f}s):")
+    print(f"  {'ms':>9}  {'%':>5}  {'function':<20} {'sls':<28} id")
+    for s in sorted(noop, key=lambda s: s.duration, reverse=True)[:top]:
+        print(f"  {s.duration:>9.1f}  {s.duration * 100 / total:>5.1f}  {s.function:<20} {s.sls:<28} {s.id}")
+    if changed:
+        print(f"\nChanged on the second run ({len(changed)}):")
+        for s in changed:
+            print(f"  {s.function:<20} {s.sls:<28} {s.id}")
+            print(f"      changes: {', '.join(sorted(map(str, s.changes)))}")
+    return changed
+
+
+def write_collapsed_stacks(states, path):
+    """Write a flamegraph-style collapsed-stack file (highstate;sls;function;id usec)."""
+    with open(path, "w") as f:
+        for s in sorted(states, key=lambda s: s.run_num):
+            frames = ["highstate", s.sls, s.function, s.id]
+            stack = ";".join(frame.replace(";", ",") for frame in frames)
+            f.write(f"{stack} {round(s.duration * 1000)}\n")
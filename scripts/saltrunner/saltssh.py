@@ -0,0 +1,192 @@
+"""salt-ssh invocation: roster generation and streamed, summarised runs."""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .common import CACHE_DIR, LOG_DIR, ROSTER, SALT_DIR, admin_key
+from .logstore import new_run_id, run_entry, store_run
+from .results import parse_salt_json, render_log, summarize
+
+
+def salt_ssh_target(minion_id):
+    """salt-ssh target arguments for one minion ID or a list of them."""
+    if isinstance(minion_id, str):
+        return [minion_id]
+    return ["-L", ",".join(minion_id)]
+
+
+def salt_ssh_cmd(minion_id, *args, max_procs=None):
+    """Build a salt-ssh command line with JSON output.
+
+    minion_id is one minion ID or a list of them; max_procs caps how many
+    targets salt-ssh works on at once.
+    """
+    return [
+        "salt-ssh",
+        "-c", str(SALT_DIR),
+        "--ignore-host-keys",
+        "--out=json",
+        "--out-indent=4",
+        "--static",
+        *([f"--max-procs={max_procs}"] if max_procs else []),
+        *salt_ssh_target(minion_id),
+        *args,
+    ]
+
+
+def roster_ssh_options(sock):
+    """Roster lines making salt-ssh's ssh/scp attach to the ControlMaster on sock."""
+    if not sock:
+        return ""
+    return (
+        "  ssh_options:\n"
+        "    - ControlMaster=no\n"
+        f"    - ControlPath={sock}\n"
+    )
+
+
+def write_roster(minion_id, host, port, env, sock=None):
+    """Write the salt-ssh roster for one target.
+
+    With sock, salt-ssh connects through that ControlMaster socket.
+    """
+    ROSTER.write_text(
+        f"{minion_id}:\n"
+        f"  host: {host}\n"
+        f"  port: {port}\n"
+        f"  user: admin\n"
+        f"  sudo: True\n"
+        f"  priv: {admin_key(env)}\n"
+        + roster_ssh_options(sock)
+    )
+
+
+def thin_tarball():
+    """Path of the salt-thin tarball salt-ssh ships to targets, under the master's cachedir."""
+    cachedir = CACHE_DIR
+    for line in (SALT_DIR / "master").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key.strip() == "cachedir" and value.strip():
+            cachedir = Path(value.strip())
+    return cachedir / "thin" / "thin.tgz"
+
+
+def cleanup_roster():
+    """Remove the generated roster file."""
+    if ROSTER.exists():
+        ROSTER.unlink()
+
+
+def run_with_spinner(cmd, minion_id, label="Running", exit_on_error=True):
+    """Run salt-ssh with a spinner, tee output to disk, print summary.
+
+    Raw JSON output is teed to a .json file as it arrives (with --static
+    salt-ssh prints it all when it exits).  The full JSON is then parsed in
+    one pass, a human-readable log
+    is rendered from the data, both are filed in the log store under a new
+    run ID and the parsed {minion: [StateResult]} dict is returned.  To stop
+    at the first failing state, pass failhard=True in cmd.  A nonzero
+    salt-ssh exit status exits the script unless exit_on_error is False.
+    The summary line is printed for minion_id; when minion_id is a list
+    (see salt_ssh_cmd) only the log path is printed and the per-host
+    summary is left to the caller.
+    """
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    run_id = new_run_id()
+    json_path = LOG_DIR / f"salt-ssh-{run_id}.json"
+
+    stop = threading.Event()
+    start = time.time()
+
+    def spinner():
+        chars = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+        i = 0
+        while not stop.is_set():
+            elapsed = int(time.time() - start)
+            print(
+                f"\r{chars[i % len(chars)]} {label}... {elapsed}s",
+                end="",
+                flush=True,
+            )
+            i += 1
+            stop.wait(0.2)
+        elapsed = int(time.time() - start)
+        print(f"\r✓ Done in {elapsed}s{' ' * 40}")
+
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+    # stderr is small (warnings, connection errors) — drain it on a side thread
+    # so a full pipe never blocks salt-ssh while we stream stdout.
+    stderr_lines = []
+    err_reader = threading.Thread(
+        target=lambda: stderr_lines.extend(proc.stderr), daemon=True
+    )
+    err_reader.start()
+    t = threading.Thread(target=spinner, daemon=True)
+    t.start()
+
+    with open(json_path, "w", buffering=1) as raw:
+        for line in proc.stdout:
+            raw.write(line)
+    returncode = proc.wait()
+    err_reader.join()
+    stop.set()
+    t.join()
+
+    try:
+        with open(json_path) as f:
+            results = parse_salt_json(json.load(f))
+    except (json.JSONDecodeError, AttributeError):
+        results = None
+
+    raw_output = json_path.read_text()
+    log_text = render_log(results) if results is not None else raw_output
+    if stderr_lines:
+        log_text += "\n--- stderr ---\n" + "".join(stderr_lines)
+    target = salt_ssh_target(minion_id)[-1]
+    command = " ".join(cmd[cmd.index(target) + 1:]) if target in cmd else " ".join(cmd)
+    minions = [minion_id] if isinstance(minion_id, str) else minion_id
+    outcomes = results or {m: raw_output.strip() or "".join(stderr_lines) for m in minions}
+    entries = [
+        run_entry(run_id, minion, states, command, label, start, time.time() - start, returncode)
+        for minion, states in outcomes.items()
+    ]
+    log_path = store_run(run_id, json_path, log_text, entries)
+
+    states = results.get(minion_id) if results and isinstance(minion_id, str) else None
+    if not isinstance(minion_id, str):
+        print(f"   log: {log_path}")
+    elif isinstance(states, list):
+        summary, failed_ids = summarize(states)
+        changed = summary["changed"]
+        failed = summary["failed"]
+        parts = [f"succeeded={summary['succeeded']}"]
+        if changed:
+            parts.append(f"changed={changed}")
+        if failed:
+            parts.append(f"failed={failed}")
+        status = "✓" if not failed else "✗"
+        print(f"{status}  {', '.join(parts)}  — log: {log_path}")
+        for fid in failed_ids:
+            print(f"  FAILED: {fid}")
+    elif isinstance(states, str):
+        print(f"✗  {minion_id}: {states}  — log: {log_path}")
+    else:
+        # No state results — print raw output (non-state commands, errors)
+        if raw_output:
+            print(raw_output)
+        if stderr_lines:
+            print("".join(stderr_lines), file=sys.stderr)
+
+    if returncode != 0 and exit_on_error:
+        sys.exit(returncode)
+    return results
@@ -0,0 +1,100 @@
+"""Decrypting the SOPS-encrypted pillar files a run needs, with a tmpfs cache."""
+
+import fnmatch
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .common import REPO_DIR, SECRETS_DIR, private_dir
+
+
+def secrets_for_minions(minion_ids):
+    """Return the encrypted secrets files pillar/top.sls assigns to any of minion_ids."""
+    needed = []
+    target = None
+    for line in (REPO_DIR / "salt" / "pillar" / "top.sls").read_text().splitlines():
+        if m := re.match(r"""^\s+['"]?([^'"\s#-][^'"]*?)['"]?:\s*$""", line):
+            target = m.group(1)
+        elif (m := re.match(r"^\s+-\s+(secrets[/.]\S+)\s*$", line)) and target:
+            if any(fnmatch.fnmatch(minion_id, target) for minion_id in minion_ids):
+                rel = m.group(1).removeprefix("secrets").lstrip("/.").replace(".", "/")
+                enc = SECRETS_DIR / f"{rel}.sls.enc"
+                if enc.exists() and enc not in needed:
+                    needed.append(enc)
+    return needed
+
+
+def secrets_cache_dir():
+    """Return the tmpfs-backed plaintext cache directory, created mode 0700.
+
+    Exits before any plaintext is written unless the directory is owned by
+    the current user, is not a symlink and has mode 0700.
+    """
+    base = Path(os.environ.get("XDG_RUNTIME_DIR") or "/dev/shm")
+    return private_dir(base / f"server-salt-secrets-{os.getuid()}")
+
+
+def wipe_file(path):
+    """Overwrite a plaintext file with zeros, then unlink it."""
+    with open(path, "r+b") as f:
+        f.write(b"\0" * os.fstat(f.fileno()).st_size)
+        f.flush()
+        os.fsync(f.fileno())
+    path.unlink()
+
+
+def write_private(path, data):
+    """Write bytes to path with mode 0600."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+def decrypt_secrets(env, minion_ids):
+    """Decrypt the *.sls.enc files needed by minion_ids to *.sls.
+
+    Plaintext is cached in tmpfs keyed by the SHA-256 of the ciphertext, so
+    an unchanged file is only decrypted once per SECRETS_CACHE_TTL seconds
+    (default 900, 0 disables the cache).  Expired entries are zeroed before
+    removal.  Cache misses are decrypted in parallel.
+    """
+    ttl = int(env.get("SECRETS_CACHE_TTL", "900"))
+    cache = secrets_cache_dir() if ttl > 0 else None
+    if cache:
+        for entry in cache.glob("*.sls"):
+            if time.time() - entry.stat().st_mtime > ttl:
+                wipe_file(entry)
+
+    def decrypt(enc):
+        digest = hashlib.sha256(enc.read_bytes()).hexdigest()
+        cached = cache / f"{digest}.sls" if cache else None
+        if cached and cached.exists():
+            plaintext = cached.read_bytes()
+        else:
+            result = subprocess.run(
+                ["sops", "--input-type=yaml", "--output-type=yaml", "-d", str(enc)],
+                capture_output=True,
+            )
+            if result.returncode != 0:
+                return f"{enc.name}: {result.stderr.decode().strip()}"
+            plaintext = result.stdout
+            if cached:
+                write_private(cached, plaintext)
+        write_private(enc.with_suffix(""), plaintext)  # strip .enc
+        return None
+
+    with ThreadPoolExecutor() as pool:
+        errors = [e for e in pool.map(decrypt, secrets_for_minions(minion_ids)) if e]
+    if errors:
+        sys.exit("sops error: " + "\n".join(errors))
+
+
+def cleanup_secrets():
+    """Remove all decrypted *.sls files (recursively)."""
+    for sls in SECRETS_DIR.rglob("*.sls"):
+        sls.unlink()
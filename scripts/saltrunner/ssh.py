@@ -0,0 +1,189 @@
+"""SSH readiness probes, the shared per-target ControlMaster and its benchmark."""
+
+import atexit
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .common import admin_key, private_dir, run
+from .saltssh import salt_ssh_cmd, write_roster
+from .secretfiles import decrypt_secrets
+
+
+def probe_ssh_banner(host, port, timeout=2.0):
+    """Return True if host:port completes a TCP connect and sends an SSH-2.0 banner."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            return sock.recv(64).startswith(b"SSH-2.0-")
+    except OSError:
+        return False
+
+
+def probe_ssh_auth(host, port, key):
+    """Return True if a key-authenticated SSH session as admin can run a command."""
+    result = subprocess.run(
+        [
+            "ssh",
+            "-p", str(port),
+            "-i", key,
+            "-o", "BatchMode=yes",
+            "-o", "ConnectTimeout=5",
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "UserKnownHostsFile=/dev/null",
+            "-o", "LogLevel=ERROR",
+            f"admin@{host}",
+            "true",
+        ],
+        capture_output=True,
+    )
+    return result.returncode == 0
+
+
+def ready_key(env):
+    """Key for the readiness auth probe, or None when SSH_READY_CHECK=banner."""
+    if env.get("SSH_READY_CHECK", "auth") == "banner":
+        return None
+    return admin_key(env)
+
+
+def wait_for_sshd(host, port=22, timeout=120, key=None):
+    """Wait until sshd sends its banner and, if key is given, accepts key auth.
+
+    Probes back off exponentially with jitter from 50 ms up to 2 s, so a
+    fast boot is noticed within tens of milliseconds.
+    """
+    print("Waiting for sshd...", end="", flush=True)
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if probe_ssh_banner(host, port) and (key is None or probe_ssh_auth(host, port, key)):
+            print(" ready.")
+            return
+        print(".", end="", flush=True)
+        remaining = deadline - time.monotonic()
+        time.sleep(max(0.0, min(delay * random.uniform(0.5, 1.5), remaining)))
+        delay = min(delay * 2, 2.0)
+    sys.exit(f"\nsshd not ready after {timeout}s")
+
+
+def control_path(host, port):
+    """Return the ControlMaster socket path for host:port, in a private 0700 dir."""
+    sock_dir = private_dir(Path(tempfile.gettempdir()) / f"server-salt-ssh-{os.getuid()}")
+    return sock_dir / f"{host}-{port}.sock"
+
+
+def start_control_master(env, host, port):
+    """Start the shared ControlMaster for host:port unless one is running; return its socket.
+
+    salt-ssh (via the roster's ssh_options) and the runner's own ssh calls
+    attach to it, so a run pays for one SSH handshake per target.  The
+    master is closed at exit and by ControlPersist if the runner dies.
+    """
+    sock = control_path(host, port)
+    check = subprocess.run(
+        ["ssh", "-S", str(sock), "-O", "check", f"admin@{host}"],
+        capture_output=True,
+    )
+    if check.returncode != 0:
+        run([
+            "ssh", "-f", "-N", "-M",
+            "-S", str(sock),
+            "-p", str(port),
+            "-i", admin_key(env),
+            "-o", f"ControlPersist={env.get('SSH_CONTROL_PERSIST', '600')}",
+            "-o", "BatchMode=yes",
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "UserKnownHostsFile=/dev/null",
+            "-o", "LogLevel=ERROR",
+            f"admin@{host}",
+        ])
+        atexit.register(stop_control_master, host, sock)
+    return sock
+
+
+def stop_control_master(host, sock):
+    """Ask the ControlMaster on sock to exit."""
+    subprocess.run(
+        ["ssh", "-S", str(sock), "-O", "exit", f"admin@{host}"],
+        capture_output=True,
+    )
+
+
+def ssh_bytes(host, port):
+    """Return (sent, received) bytes over this host's established TCP connections to host:port.
+
+    Read from the kernel's per-socket counters (ss -ti).  Runs go through
+    the one ControlMaster connection, so the delta across a run is what the
+    run moved over SSH.  Returns None if ss is unavailable.
+    """
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+        result = subprocess.run(
+            ["ss", "-tinH", "state", "established", f"( dport = :{port} )"],
+            capture_output=True,
+            text=True,
+        )
+    except (OSError, socket.gaierror):
+        return None
+    if result.returncode != 0:
+        return None
+    sent = received = 0
+    peer = None
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if not line[:1].isspace():
+            peer = fields[-1].rpartition(":")[0].strip("[]") if fields else None
+            continue
+        if peer in addresses:
+            counters = dict(f.split(":", 1) for f in fields if f.startswith(("bytes_sent:", "bytes_received:")))
+            sent += int(counters.get("bytes_sent", 0))
+            received += int(counters.get("bytes_received", 0))
+    return sent, received
+
+
+def ssh_logins(sock, host, since):
+    """Count sshd 'Accepted publickey' journal entries on the target since an epoch time."""
+    result = subprocess.run(
+        [
+            "ssh", "-S", str(sock), f"admin@{host}",
+            f"sudo journalctl SYSLOG_IDENTIFIER=sshd SYSLOG_IDENTIFIER=sshd-session"
+            f" --since @{since} -o cat -q | grep -c 'Accepted publickey'",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    return int(result.stdout.strip() or 0)
+
+
+def ssh_bench(env, minion_id, host, port, runs):
+    """Time salt-ssh test.ping runs without and with the shared ControlMaster.
+
+    Handshakes are counted on the target from sshd's journal, so they cover
+    every connection salt-ssh opened (thin check, command, scp).
+    """
+    sock = start_control_master(env, host, port)
+    write_roster(minion_id, host, port, env, sock)
+    decrypt_secrets(env, [minion_id])
+    warmup = subprocess.run(salt_ssh_cmd(minion_id, "test.ping"), capture_output=True, text=True)
+    if warmup.returncode != 0:
+        sys.exit(f"salt-ssh test.ping failed:\n{warmup.stdout}{warmup.stderr}")
+    rows = []
+    for label, path in (("direct", None), ("multiplexed", sock)):
+        write_roster(minion_id, host, port, env, path)
+        time.sleep(1)  # journalctl --since has one-second resolution
+        since = int(time.time())
+        start = time.monotonic()
+        for _ in range(runs):
+            subprocess.run(salt_ssh_cmd(minion_id, "test.ping"), capture_output=True)
+        rows.append((label, time.monotonic() - start, ssh_logins(sock, host, since)))
+    print(f"\nsalt-ssh test.ping x{runs} against {host}:{port}\n")
+    print(f"  {'mode':<12} {'wall':>8} {'per run':>8} {'handshakes':>11}")
+    for label, elapsed, logins in rows:
+        print(f"  {label:<12} {elapsed:>7.2f}s {elapsed / runs:>7.2f}s {logins:>11}")
+    print(f"\n  speedup: {rows[0][1] / rows[1][1]:.1f}x  (multiplexed runs share the master's single handshake)")
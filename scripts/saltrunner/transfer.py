@@ -0,0 +1,118 @@
+"""What a salt-ssh run ships: state bundle estimates and per-run SSH byte reports.
+
+salt-ssh renders SLS files on the master and sends the target a
+salt_state.tgz holding the lowstate, the pillar and every salt:// file the
+states reference, on every run; it cannot skip one the target already has.
+state_bundle() only reports: it gzips the SLS files and their sources in
+memory to estimate their share of that tarball and hash them, so whether
+they changed since the last run can be shown.  Nothing outside file_roots,
+and nothing a state does not reference, is ever part of it.
+"""
+
+import gzip
+import hashlib
+import io
+import tarfile
+import time
+from contextlib import contextmanager
+
+from .common import CACHE_DIR, STATES_DIR, read_cache, write_cache
+from .incremental import scan_sls, sls_file, sls_modules
+from .saltssh import thin_tarball
+from .ssh import ssh_bytes
+
+BUNDLE_CACHE = CACHE_DIR / "state-bundles.json"
+BUNDLE_SIZES = CACHE_DIR / "state-bundle-sizes.json"
+
+
+def bundle_files(modules):
+    """Sorted {relative path: Path} of the SLS files and salt:// sources of modules."""
+    files = {}
+    for sls in modules:
+        path = sls_file(sls)
+        files[str(path.relative_to(STATES_DIR))] = path
+        for source in scan_sls(sls)["sources"]:
+            path = STATES_DIR / source
+            for f in sorted(path.rglob("*")) if path.is_dir() else [path]:
+                if f.is_file() and f.resolve().is_relative_to(STATES_DIR.resolve()):
+                    files[str(f.relative_to(STATES_DIR))] = f
+    return dict(sorted(files.items()))
+
+
+def state_bundle(modules):
+    """Return (gzipped size, digest) of the state files for modules and everything they include.
+
+    The tarball is built in memory only and never written out; the digest
+    covers file names, modes and contents.  Both are cached per module list
+    and only recomputed when a file's name, mode, size or mtime changes, so
+    an unchanged tree costs one stat() per file.
+    """
+    files = bundle_files(sls_modules(modules))
+    stamp = hashlib.sha256()
+    for name, path in files.items():
+        st = path.stat()
+        stamp.update(f"{name}\0{st.st_mode & 0o777:o}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+    stamp = stamp.hexdigest()
+    key = ",".join(modules) if modules else "highstate"
+    cached = read_cache(BUNDLE_SIZES, key, float("inf"))
+    if cached and cached["stamp"] == stamp:
+        return cached["size"], cached["digest"]
+
+    digest = hashlib.sha256()
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as gz, tarfile.open(fileobj=gz, mode="w") as tar:
+        for name, path in files.items():
+            data = path.read_bytes()
+            mode = path.stat().st_mode & 0o777
+            digest.update(f"{name}\0{mode:o}\0".encode())
+            digest.update(data + b"\0")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = mode
+            tar.addfile(info, io.BytesIO(data))
+    write_cache(BUNDLE_SIZES, key, {"stamp": stamp, "size": buf.tell(), "digest": digest.hexdigest()})
+    return buf.tell(), digest.hexdigest()
+
+
+def last_bundle(minion_id, digest=None):
+    """Digest of the bundle last applied to minion_id; with digest, record that one instead."""
+    if digest is None:
+        entry = read_cache(BUNDLE_CACHE, minion_id, float("inf"))
+        return entry and entry["digest"]
+    write_cache(BUNDLE_CACHE, minion_id, {"digest": digest})
+    return digest
+
+
+def format_bytes(n):
+    return f"{n / 2**20:.1f} MiB" if n >= 2**20 else f"{n / 1024:.1f} KiB"
+
+
+@contextmanager
+def measured_transfer(minion_id, target, modules):
+    """Report the bytes a salt-ssh run moved over the target's ControlMaster.
+
+    Prints the SSH bytes sent and received during the block and the wall
+    time; those are the only measured transfer figures.  The thin tarball
+    size and the estimated state bundle size follow on a second line, noting
+    whether the bundle changed since the last run against minion_id.
+    """
+    size, digest = state_bundle(modules)
+    previous = last_bundle(minion_id)
+    before = ssh_bytes(target.host, target.port)
+    start = time.monotonic()
+    yield
+    elapsed = time.monotonic() - start
+    after = ssh_bytes(target.host, target.port)
+    last_bundle(minion_id, digest)
+    thin = thin_tarball()
+    if before and after:
+        sent, received = format_bytes(after[0] - before[0]), format_bytes(after[1] - before[1])
+        print(f"Transfer: SSH sent {sent}, received {received} in {elapsed:.1f}s")
+    else:
+        print(f"Transfer: {elapsed:.1f}s (no SSH byte counters for this target)")
+    state = "unchanged" if previous == digest else "changed" if previous else "new"
+    payload = f"thin.tgz {format_bytes(thin.stat().st_size)}, " if thin.exists() else ""
+    print(
+        f"Payload:  {payload}state files {digest[:12]} ~{format_bytes(size)} gzipped ({state});"
+        " salt_state.tgz also carries the lowstate and pillar"
+    )
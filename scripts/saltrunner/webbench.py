@@ -0,0 +1,141 @@
+"""Web benchmarks: nginx throughput and latency on the converged Docker target.
+
+The target runs the full highstate plus www.nginx, so the numbers include
+the nftables ruleset and sysctl hardening.  A bench vhost serves the fixed
+loadgen.py corpus over HTTP and TLS.  The load generator runs inside the
+container against loopback, so it shares the container's CPUs with nginx.
+"""
+
+import json
+import subprocess
+import sys
+import time
+
+from .bench import BENCH_DIR, git_revision
+from .common import REPO_DIR
+from .saltssh import run_with_spinner, salt_ssh_cmd
+
+LOADGEN = REPO_DIR / "scripts" / "loadgen.py"
+WEB_RESULTS = BENCH_DIR / "web.jsonl"
+BENCH_HOST = "bench.test"
+BENCH_ROOT = "/srv/www/bench"
+CONCURRENCY = (1, 16, 64, 256)
+SCHEMES = ("http", "https")
+
+# Matrix variants: nginx:performance overrides on top of the pillar defaults
+WEB_MATRIX = {
+    "default": {},
+    "conn-1024": {"worker_connections": 1024, "worker_rlimit_nofile": 2048},
+    "unbuffered-log": {"access_log_buffer": False},
+    "no-gzip": {"gzip": False, "gzip_static": False},
+    "no-open-file-cache": {"open_file_cache_max": 0},
+    "reuseport": {"reuseport": True},
+}
+
+BENCH_SITE = f"""\
+# Web benchmark vhost, written by `bench-web` (not managed by Salt)
+server {{
+    listen      80;
+    listen      443 ssl;
+    server_name {BENCH_HOST};
+
+    ssl_certificate     /etc/nginx/bench.crt;
+    ssl_certificate_key /etc/nginx/bench.key;
+
+    root {BENCH_ROOT};
+}}
+"""
+
+
+def container_exec(container, *cmd, stdin=None):
+    """Run cmd in the container as root; exit with its output on failure."""
+    result = subprocess.run(
+        ["docker", "exec", "-i", container, *cmd],
+        input=stdin,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"{' '.join(cmd)} failed in {container}:\n{result.stdout}{result.stderr}")
+    return result.stdout
+
+
+def prepare_web_bench(container):
+    """Install the load generator, corpus, a self-signed certificate and the bench vhost."""
+    subprocess.run(["docker", "cp", str(LOADGEN), f"{container}:/usr/local/bin/loadgen.py"], check=True)
+    container_exec(container, "python3", "/usr/local/bin/loadgen.py", "corpus", BENCH_ROOT)
+    container_exec(
+        container, "sh", "-c",
+        "test -s /etc/nginx/bench.key || openssl req -x509 -newkey ec"
+        " -pkeyopt ec_paramgen_curve:P-256 -nodes -days 30"
+        f" -subj /CN={BENCH_HOST} -keyout /etc/nginx/bench.key -out /etc/nginx/bench.crt",
+    )
+    container_exec(container, "tee", "/etc/nginx/sites-enabled/bench", stdin=BENCH_SITE)
+
+
+def apply_variant(minion_id, container, name, overrides):
+    """Render www.nginx with the variant's pillar overrides and restart nginx."""
+    pillar = json.dumps({"nginx": {"performance": overrides}})
+    run_with_spinner(
+        salt_ssh_cmd(minion_id, "state.apply", "www.nginx", f"pillar={pillar}"),
+        minion_id,
+        label=f"Applying www.nginx ({name})",
+    )
+    # A fresh master and workers per variant, so caches start out equally cold
+    container_exec(container, "sh", "-c", "nginx -t -q && systemctl restart nginx")
+
+
+def load_run(container, scheme, concurrency, seconds):
+    """Run loadgen.py in the container and return its summary."""
+    out = container_exec(
+        container, "python3", "/usr/local/bin/loadgen.py", "run",
+        f"{scheme}://127.0.0.1/", str(concurrency), str(seconds), f"--host={BENCH_HOST}",
+    )
+    return json.loads(out)
+
+
+def format_ms(ms):
+    return f"{ms:.2f}ms" if ms is not None else "-"
+
+
+def run_web_benchmark(provider, target, variants, seconds=10):
+    """Converge the target, then load each variant at every scheme and concurrency level.
+
+    Every measurement is appended to WEB_RESULTS with the variant's
+    overrides and the git revision.
+    """
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    revision = git_revision()
+    highstate = provider.highstate(target)
+    if highstate is not None:
+        args, label, _ = highstate
+        run_with_spinner(salt_ssh_cmd(provider.minion_id, *args), provider.minion_id, label=label)
+    prepare_web_bench(target.name)
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    for name in variants:
+        apply_variant(provider.minion_id, target.name, name, WEB_MATRIX[name])
+        print(f"\n{'variant':<20} {'scheme':<6} {'conc':>5} {'req/s':>10} {'p50':>9} {'p99':>9} {'MiB/s':>8} {'errors':>7}")
+        for scheme in SCHEMES:
+            for concurrency in CONCURRENCY:
+                result = load_run(target.name, scheme, concurrency, seconds)
+                record = {
+                    "run_id": run_id,
+                    "revision": revision,
+                    "time": time.time(),
+                    "variant": name,
+                    "overrides": WEB_MATRIX[name],
+                    "scheme": scheme,
+                    "concurrency": concurrency,
+                    **result,
+                }
+                with open(WEB_RESULTS, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+                print(
+                    f"{name:<20} {scheme:<6} {concurrency:>5} {result['rps']:>10.1f}"
+                    f" {format_ms(result['p50_ms']):>9} {format_ms(result['p99_ms']):>9}"
+                    f" {result['mib_s']:>8.1f} {result['errors']:>7}"
+                )
+    if list(variants) != ["default"]:
+        apply_variant(provider.minion_id, target.name, "default", {})
+    print(f"\nResults: {WEB_RESULTS} (run {run_id})")
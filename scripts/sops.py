@@ -2,10 +2,17 @@
 """SOPS helper for managing encrypted secrets with base64 file support."""
 
 import base64
+import binascii
+import fnmatch
+import json
+import os
+import shlex
 import subprocess
 import sys
 from pathlib import Path
 
+SOPS_UNCHANGED = 200  # sops exit status when an edit session left the file as it was
+
 USAGE = """\
 Usage: sops.py <command> [args]
 
@@ -14,8 +21,17 @@ Commands:
   export <sops-file> <key> <file>   Extract base64 value from SOPS yaml and decode to file
   edit   <sops-file>                Open SOPS file in editor (decrypts/re-encrypts)
   rotate <sops-file>                Rotate data encryption keys
+  batch  <sops-file> <manifest>     Apply many imports/exports with one decrypt/encrypt
+  export-all <sops-file> <prefix> <dir> <keys>
+                                    Decode the base64 values under prefix whose
+                                    keys match one of the comma-separated globs
+                                    in keys (relative to prefix) into dir
+
+Keys use dot notation: ssh.admin_ed25519
 
-Keys use dot notation: ssh.admin_ed25519\
+Manifest lines (blank lines and # comments ignored):
+  import <key> <file>
+  export <key> <file>\
 """
 
 
@@ -26,7 +42,7 @@ def dot_to_bracket(key):
 
 def sls_flags(sops_file):
     """Return extra flags for .sls files (SOPS doesn't recognize the extension)."""
-    if sops_file.endswith(".sls"):
+    if sops_file.endswith((".sls", ".sls.enc")):
         return ["--input-type=yaml", "--output-type=yaml"]
     return []
 
@@ -66,6 +82,143 @@ def cmd_rotate(sops_file):
     print(f"Rotated data keys in {sops_file}")
 
 
+def read_manifest(manifest):
+    """Parse a batch manifest into (direction, key, path) tuples."""
+    entries = []
+    for n, line in enumerate(Path(manifest).read_text().splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 2)
+        if len(parts) != 3 or parts[0] not in ("import", "export"):
+            sys.exit(f"{manifest}:{n}: expected 'import|export <key> <file>'")
+        direction, key, path = parts
+        entries.append((direction, key, Path(path).expanduser()))
+    return entries
+
+
+def get_key(tree, key):
+    """Look up a dot-notation key in a decrypted tree."""
+    node = tree
+    for part in key.split("."):
+        if not isinstance(node, dict) or part not in node:
+            sys.exit(f"Error: key {key} not found")
+        node = node[part]
+    return node
+
+
+def set_key(tree, key, value):
+    """Set a dot-notation key in a decrypted tree, creating parents as needed."""
+    *parents, leaf = key.split(".")
+    node = tree
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = value
+
+
+def decrypt_tree(sops_file):
+    """Decrypt a SOPS file once and return its data as a dict."""
+    extra = ["--input-type=yaml"] if sls_flags(sops_file) else []
+    result = subprocess.run(
+        ["sops", *extra, "--output-type=json", "-d", sops_file],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"sops error: {result.stderr.strip()}")
+    tree = json.loads(result.stdout)
+    tree.pop("sops", None)
+    return tree
+
+
+def export_value(encoded, output_file):
+    """Decode a base64 value and write it to output_file with mode 0600."""
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(base64.b64decode(encoded.strip()))
+
+
+def apply_manifest(tree, entries):
+    """Apply manifest entries to a decrypted tree in order."""
+    for direction, key, path in entries:
+        if direction == "import":
+            if not path.exists():
+                sys.exit(f"Error: {path} not found")
+            set_key(tree, key, base64.b64encode(path.read_bytes()).decode())
+            print(f"Imported {path} -> {key}", file=sys.stderr)
+        else:
+            export_value(get_key(tree, key), path)
+            print(f"Exported {key} -> {path}", file=sys.stderr)
+
+
+def cmd_batch(sops_file, manifest):
+    entries = read_manifest(manifest)
+    if not any(direction == "import" for direction, _, _ in entries):
+        # Export-only: a single decrypt, no re-encrypt
+        apply_manifest(decrypt_tree(sops_file), entries)
+        return
+    # Let sops decrypt to its temp file once, have this script apply every
+    # edit as the "editor", then sops re-encrypts once with the same data key.
+    editor = shlex.join(
+        [sys.executable, str(Path(__file__).resolve()), "_apply", str(Path(manifest).resolve())]
+    )
+    result = subprocess.run(
+        ["sops", *sls_flags(sops_file), sops_file],
+        env={**os.environ, "EDITOR": editor, "SOPS_EDITOR": editor},
+    )
+    if result.returncode == SOPS_UNCHANGED:
+        print(f"Applied {len(entries)} entries from {manifest}; {sops_file} unchanged")
+        return
+    if result.returncode != 0:
+        sys.exit(result.returncode)
+    print(f"Applied {len(entries)} entries from {manifest} -> {sops_file}")
+
+
+def cmd_apply(manifest, plaintext_file):
+    """Editor hook for cmd_batch: edit the decrypted temp file sops hands us."""
+    try:
+        import yaml
+    except ImportError:
+        sys.exit("batch import requires PyYAML (pip install pyyaml)")
+    path = Path(plaintext_file)
+    tree = yaml.safe_load(path.read_text()) or {}
+    apply_manifest(tree, read_manifest(manifest))
+    path.write_text(
+        yaml.safe_dump(tree, sort_keys=False, default_flow_style=False, width=float("inf"))
+    )
+
+
+def cmd_export_all(sops_file, prefix, output_dir, keys):
+    """Export the values under prefix whose relative keys match a glob in keys.
+
+    Only matching keys are decoded: any short word ("true", "user") is
+    valid base64, so the values cannot tell which ones hold files.
+    """
+    patterns = [p.strip() for p in keys.split(",") if p.strip()]
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    count = 0
+
+    def walk(node, key):
+        nonlocal count
+        if isinstance(node, dict):
+            for child, value in node.items():
+                walk(value, f"{key}.{child}")
+            return
+        relative = key[len(prefix) + 1:]
+        if not any(fnmatch.fnmatchcase(relative, p) for p in patterns):
+            return
+        try:
+            base64.b64decode(str(node).strip(), validate=True)
+        except binascii.Error:
+            sys.exit(f"Error: {key} matches {keys} but is not base64")
+        export_value(str(node), out / key)
+        count += 1
+
+    walk(get_key(decrypt_tree(sops_file), prefix), prefix)
+    print(f"Exported {count} values under {prefix} -> {out}")
+
+
 def main():
     if len(sys.argv) < 2:
         print(USAGE)
@@ -78,6 +231,9 @@ def main():
         "export": (cmd_export, 3),
         "edit": (cmd_edit, 1),
         "rotate": (cmd_rotate, 1),
+        "batch": (cmd_batch, 2),
+        "export-all": (cmd_export_all, 4),
+        "_apply": (cmd_apply, 2),
     }
 
     if cmd in ("help", "-h", "--help"):